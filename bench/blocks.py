@@ -0,0 +1,41 @@
+"""
+measures translation time of functions with many blocks (should grow linearly)
+
+usage: python bench/blocks.py [sizes...]
+"""
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.setrecursionlimit(100000)
+
+import frontend.parser as par
+from backend.llvm.translator import translate_program
+
+
+def program(n):
+    """returns program with a function of about 2n blocks (n if statements)"""
+    body = '\n'.join(f'  if (x > {i}) x = x - 1;' for i in range(n))
+    return f'int main() {{\n  int x = readInt();\n{body}\n  return x;\n}}\n'
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [2500, 5000, 10000, 20000]
+    print(f'{"ifs":>8} {"blocks":>8} {"time [s]":>10} {"us/block":>10}')
+    for n in sizes:
+        p = par.parse(program(n))
+        p.check()
+        gc.collect()
+        gc.disable()  # keep collections of the (large) AST out of the measurement
+        start = time.perf_counter()
+        llvm = translate_program(p)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        blocks = sum(len(d.blocks) for d in llvm.topdefs if hasattr(d, 'blocks'))
+        print(f'{n:>8} {blocks:>8} {elapsed:>10.3f} {elapsed / blocks * 1e6:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
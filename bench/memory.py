@@ -0,0 +1,48 @@
+"""
+measures memory (traced by tracemalloc) of checked abstract syntax trees of programs of the given numbers of lines
+(functions of 20 lines, each calling the previous one, so none of them is removed as unused)
+
+usage: python bench/memory.py [lines...]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import frontend.parser as par
+import stats
+from parse import function
+
+
+def program(lines):
+    n = lines // 20
+    return ''.join(function(i) for i in range(n)) + f'int main() {{\n  printInt(f{n - 1}(3, new int[3]));\n  return 0;\n}}\n'
+
+
+def measure(text):
+    """returns checked program and bytes allocated for it"""
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    tree = par.parse(text)
+    tree.check()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return tree, size
+
+
+def main():
+    sys.setrecursionlimit(100000)
+    sizes = [int(a) for a in sys.argv[1:]] or [10000, 50000, 100000]
+    print(f'{"lines":>8} {"nodes":>9} {"memory [MB]":>12} {"bytes/node":>11}')
+    for n in sizes:
+        tree, size = measure(program(n))
+        nodes = stats.ast_nodes(tree)
+        print(f'{n:>8} {nodes:>9} {size / 2 ** 20:>12.1f} {size / nodes:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
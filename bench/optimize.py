@@ -0,0 +1,68 @@
+"""
+compares serial and parallel optimization of modules with many functions (output must be identical)
+
+usage: python bench/optimize.py [-j jobs] [functions...]
+"""
+import argparse
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import frontend.parser as par
+from backend.llvm.translator import translate_program
+from backend.llvm.optimizer import optimize_program
+
+
+def function(i):
+    """returns function with a few loops and conditionals over several local variables"""
+    return f'''int f{i}(int n) {{
+  int a = {i}, b = 1, c = 0, i = 0;
+  while (i < n) {{
+    if (i % 3 == 0) a = a + b; else b = b + a;
+    int j = 0;
+    while (j < i) {{
+      c = c + a * j - b;
+      if (c > 1000) c = c / 2;
+      j++;
+    }}
+    i++;
+  }}
+  return a + b + c;
+}}
+'''
+
+
+def program(n):
+    calls = ' + '.join(f'f{i}(10)' for i in range(n))
+    return ''.join(function(i) for i in range(n)) + f'int main() {{\n  printInt({calls});\n  return 0;\n}}\n'
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('-j', '--jobs', type=int, default=os.cpu_count())
+    argparser.add_argument('sizes', type=int, nargs='*', default=[100, 200, 400, 800])
+    args = argparser.parse_args()
+
+    print(f'{"functions":>10} {"serial [s]":>12} {f"-j {args.jobs} [s]":>12} {"speedup":>8}')
+    for n in args.sizes:
+        p = par.parse(program(n))
+        p.check()
+        serial = translate_program(p)
+        parallel = copy.deepcopy(serial)
+
+        start = time.perf_counter()
+        optimize_program(serial)
+        serial_time = time.perf_counter() - start
+        start = time.perf_counter()
+        optimize_program(parallel, args.jobs)
+        parallel_time = time.perf_counter() - start
+
+        assert str(serial) == str(parallel), 'parallel optimization changed output'
+        print(f'{n:>10} {serial_time:>12.3f} {parallel_time:>12.3f} {serial_time / parallel_time:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+compares lexing and parsing speed of the hand-written parser and the PLY parser (LATC_PARSER=ply)
+on programs of the given numbers of lines, checking that both build the same tree;
+programs consist of functions of 20 lines, with --long of a single function (the PLY parser builds
+lists of statements in quadratic time)
+
+usage: python bench/parse.py [--long] [lines...]
+"""
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.setrecursionlimit(100000)
+
+import frontend.parser as par
+import frontend.plyparser as plyparser
+from frontend import scanner
+
+
+def function(i):
+    """returns function of 20 lines"""
+    return (f'int f{i}(int n, int[] a) {{\n'
+            f'  int s = 0, k = {i};\n'
+            f'  for (int x : a) {{\n'
+            f'    if (x % 2 == 0 && x > k || !(x < 0)) s = s + x * {i % 7 + 1};\n'
+            f'    else s--;\n'
+            f'  }}\n'
+            f'  while (n > 0) {{\n'
+            f'    a[n % a.length] = f{max(i - 1, 0)}(n - 1, a) + s / 3;\n'
+            f'    n = n - 1;\n'
+            f'  }}\n'
+            f'  /* comment */\n'
+            f'  string t = "line {i}";\n'
+            f'  if (s > 100) {{\n'
+            f'    printString(t);\n'
+            f'  }} else if (s < -100) {{\n'
+            f'    printInt(-s);\n'
+            f'  }}\n'
+            f'  boolean b = s != k;\n'
+            f'  return s;\n'
+            f'}}\n')
+
+
+def program(lines):
+    return ''.join(function(i) for i in range(lines // 20)) + 'int main() {\n  return 0;\n}\n'
+
+
+def long_program(lines):
+    return 'int main() {\n  int x = 0;\n' + '  x = x * 3 + 1;\n' * lines + '  return x;\n}\n'
+
+
+def measure(parse, text):
+    gc.collect()
+    gc.disable()  # keep collections of the (large) AST out of the measurement
+    start = time.perf_counter()
+    tree = parse(text)
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return tree, elapsed
+
+
+def main():
+    long = '--long' in sys.argv
+    sizes = [int(a) for a in sys.argv[1:] if a != '--long'] or ([5000, 10000, 20000, 40000] if long else [10000, 20000, 50000, 100000])
+    print(f'{"lines":>8} {"tokens":>8} {"ply [s]":>10} {"hand [s]":>10} {"ply tok/s":>10} {"hand tok/s":>11} {"speedup":>8}')
+    for n in sizes:
+        text = long_program(n) if long else program(n)
+        tokens = len(scanner.scan(text)[0]) - 1
+        ply_tree, ply_time = measure(plyparser.parse, text)
+        tree, hand_time = measure(par.parse, text)
+        assert tree == ply_tree
+        print(f'{n:>8} {tokens:>8} {ply_time:>10.3f} {hand_time:>10.3f} {tokens / ply_time:>10.0f} '
+              f'{tokens / hand_time:>11.0f} {ply_time / hand_time:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+measures optimization time of functions with many blocks and local variables (should grow almost linearly)
+
+usage: python bench/ssa.py [sizes...]
+"""
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.setrecursionlimit(100000)
+
+import frontend.parser as par
+from backend.llvm.translator import translate_program
+from backend.llvm.optimizer import optimize_program
+
+
+def program(n):
+    """returns program with a function of n loops, each updating a few of 20 variables"""
+    decls = '\n'.join(f'  int x{i} = readInt();' for i in range(20))
+    loops = '\n'.join(f'  while (x{i % 20} < {i}) {{ x{(i + 1) % 20} = x{(i + 1) % 20} + x{i % 20}; '
+                      f'if (x{(i + 2) % 20} > 0) x{i % 20}++; else x{(i + 3) % 20}--; }}' for i in range(n))
+    return f'int main() {{\n{decls}\n{loops}\n  return x0;\n}}\n'
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [250, 500, 1000, 2000]
+    print(f'{"loops":>8} {"blocks":>8} {"time [s]":>10} {"us/block":>10}')
+    for n in sizes:
+        p = par.parse(program(n))
+        p.check()
+        llvm = translate_program(p)
+        blocks = sum(len(d.blocks) for d in llvm.topdefs if hasattr(d, 'blocks'))
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        optimize_program(llvm)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        print(f'{n:>8} {blocks:>8} {elapsed:>10.3f} {elapsed / blocks * 1e6:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+measures startup time of the compiler on an empty program: checking it and compiling it to LLVM
+(without the cache) compared to starting the bare interpreter; fails if checking takes more
+than BUDGET milliseconds over the interpreter startup
+
+usage: python bench/startup.py [-n runs]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+COMPILER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'compiler.py')
+PROGRAM = b'int main() {\n  return 0;\n}\n'
+BUDGET = 100  # milliseconds
+
+
+def measure(args, runs):
+    """returns median wall time in milliseconds of running python with given arguments"""
+    env = dict(os.environ)
+    env.pop('LATC_CACHE_DIR', None)
+    env.pop('LATC_PARSER', None)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, input=PROGRAM, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=20, help='number of runs')
+    args = parser.parse_args()
+    python = measure(['-c', 'pass'], args.n)
+    check = measure([COMPILER], args.n)
+    compile = measure([COMPILER, 'c'], args.n)
+    print(f'{"command":<12} {"time [ms]":>10} {"overhead [ms]":>14}')
+    print(f'{"python":<12} {python:>10.1f}')
+    print(f'{"check":<12} {check:>10.1f} {check - python:>14.1f}')
+    print(f'{"compile":<12} {compile:>10.1f} {compile - python:>14.1f}')
+    if check - python > BUDGET:
+        print(f'checking an empty program takes more than {BUDGET} ms over the interpreter startup', file=sys.stderr)
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
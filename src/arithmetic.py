@@ -0,0 +1,23 @@
+"""64-bit integer arithmetic with the semantics of generated code (wrap-around, division truncating towards zero)"""
+
+I64_MIN = -2 ** 63
+I64_MAX = 2 ** 63 - 1
+
+
+def wrap(x):
+    """returns x reduced to a signed 64-bit integer"""
+    return (x - I64_MIN) % 2 ** 64 + I64_MIN
+
+
+def div(a, b):
+    """returns a / b or None if the result is undefined (division by zero or overflow)"""
+    if b == 0 or (a == I64_MIN and b == -1):
+        return None
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+
+def rem(a, b):
+    """returns a % b (with the sign of a) or None if the result is undefined"""
+    q = div(a, b)
+    return None if q is None else a - b * q
@@ -1,158 +1,339 @@
+"""
+code of functions: blocks of statements (slotted records) whose operands are registers, integer constants
+and names of globals ('undef' too), statements hold opcodes and types as enums
+
+registers and blocks are numbered by ids unique in their function (TopDef.new_id), their names are made
+of the ids only when the code is written
+"""
+import io
 import re
 from dataclasses import dataclass
-from backend.llvm.types import TYPE_VOID, TYPE_I1, TYPE_I8, TYPE_I8P, TYPE_I64
+from enum import IntEnum
+from slots import slotted
+from backend.llvm.types import NAMES as TYPE_NAMES, Type, TYPE_VOID, TYPE_I1, TYPE_I8, TYPE_I8P, TYPE_I64
+
+
+class Op(IntEnum):
+    """opcodes of binary operations, written as their names"""
+    ADD = 0
+    SUB = 1
+    MUL = 2
+    DIV = 3
+    REM = 4
+    EQ = 5
+    NE = 6
+    LT = 7
+    LE = 8
+    GT = 9
+    GE = 10
 
+    def __str__(self):
+        return OP_NAMES[self]
+
+    def __format__(self, spec):
+        return format(OP_NAMES[self], spec)
+
+
+OP_NAMES = {
+    Op.ADD: 'add',
+    Op.SUB: 'sub',
+    Op.MUL: 'mul',
+    Op.DIV: 'sdiv',
+    Op.REM: 'srem',
+    Op.EQ: 'icmp eq',
+    Op.NE: 'icmp ne',
+    Op.LT: 'icmp slt',
+    Op.LE: 'icmp sle',
+    Op.GT: 'icmp sgt',
+    Op.GE: 'icmp sge',
+}
+
+OP_ADD = Op.ADD
+OP_SUB = Op.SUB
+OP_MUL = Op.MUL
+OP_DIV = Op.DIV
+OP_REM = Op.REM
+OP_EQ = Op.EQ
+OP_NE = Op.NE
+OP_LT = Op.LT
+OP_LE = Op.LE
+OP_GT = Op.GT
+OP_GE = Op.GE
+
+
+class Reg:
+    """
+    register, compared and hashed by identity (statements share the object of each register they use),
+    written as %t followed by its id
+    """
+    __slots__ = ('id',)
+
+    def __init__(self, id):
+        self.id = id
 
-OP_ADD = 'add'
-OP_SUB = 'sub'
-OP_MUL = 'mul'
-OP_DIV = 'sdiv'
-OP_REM = 'srem'
-OP_EQ = 'icmp eq'
-OP_NE = 'icmp ne'
-OP_LT = 'icmp slt'
-OP_LE = 'icmp sle'
-OP_GT = 'icmp sgt'
-OP_GE = 'icmp sge'
+    def __str__(self):
+        return f'%t{self.id}'
 
+    def __format__(self, spec):  # called directly by f-strings writing statements
+        return f'%t{self.id}'
 
-@dataclass
+    __repr__ = __str__
+
+
+def operand_order(v):
+    """sort key of operands: constants, then globals, then registers in order of their ids"""
+    if isinstance(v, Reg):
+        return 2, v.id
+    return (0, v) if isinstance(v, int) else (1, v)
+
+
+@slotted
 class Block:
-    label: str
+    """block of statements, its label is its id (written as L followed by it), jumps and phis refer to blocks by labels"""
+    __slots__ = ('stmts', 'preds', 'succs')
+    label: int
 
     def __post_init__(self):
         self.stmts = []
         self.preds = []
         self.succs = []
-        self.succlabels = set()  # only used during construction
+
+    def write(self, out):
+        out.write(f'  L{self.label}:  ; preds: ' + ', '.join(f'L{p.label}' for p in self.preds) + '\n')
+        for s in self.stmts:
+            out.write(f'    {s}\n')
 
     def __str__(self):
-        return f'  {self.label}:  ; preds: ' + ', '.join(p.label for p in self.preds) + '\n' \
-               + '\n'.join(f'    {s}' for s in self.stmts)
+        return written(self)
 
-    def __hash__(self):
-        return int(self.label[1:])
+    # blocks are hashed in every analysis, identity (unlike generated methods) is compared and hashed in C
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
 
-@dataclass
+@slotted
 class StmtBinOp:
-    var: str
-    op: str
-    type: str
+    var: Reg
+    op: Op
+    type: Type
     arg1: object
     arg2: object
 
+    def uses(self):
+        return [self.arg1, self.arg2]
+
+    def replace_uses(self, f):
+        self.arg1 = f(self.arg1)
+        self.arg2 = f(self.arg2)
+
     def __str__(self):
-        return f'{self.var} = {self.op} {self.type} {self.arg1}, {self.arg2}'
+        return f'{self.var} = {OP_NAMES[self.op]} {TYPE_NAMES[self.type]} {self.arg1}, {self.arg2}'
 
-@dataclass
+@slotted
 class StmtCall:
-    var: str
-    type: str
+    var: Reg
+    type: Type
     fid: str
     args: list
+    tail: bool = False  # the call is directly followed by returning its result
+
+    def uses(self):
+        return [v for _, v in self.args]
+
+    def replace_uses(self, f):
+        self.args = [(t, f(v)) for t, v in self.args]
 
     def __str__(self):
-        return (self.var and f'{self.var} = ' or '') + f'call {self.type} @{self.fid}(' + ', '.join(f'{a[0]} {a[1]}' for a in self.args) + ')'
+        return (self.var and f'{self.var} = ' or '') + (self.tail and 'tail ' or '') + f'call {TYPE_NAMES[self.type]} @{self.fid}(' + ', '.join(f'{TYPE_NAMES[t]} {v}' for t, v in self.args) + ')'
 
-@dataclass
+@slotted
 class StmtAlloc:
-    addr: str
-    type: str
+    addr: Reg
+    type: Type
     noopt: bool = False
 
+    def uses(self):
+        return []
+
+    def replace_uses(self, f):
+        pass
+
     def __str__(self):
-        return f'{self.addr} = alloca {self.type}'
+        return f'{self.addr} = alloca {TYPE_NAMES[self.type]}'
 
-@dataclass
-class StmtAllocArray:
-    addr: str
-    type: str
-    count: str
+@slotted
+class StmtBitcast:
+    var: Reg
+    type: Type
+    val: object
+    new_type: Type
+
+    def uses(self):
+        return [self.val]
+
+    def replace_uses(self, f):
+        self.val = f(self.val)
 
     def __str__(self):
-        return f'{self.addr} = alloca {self.type}, {TYPE_I64} {self.count}'
+        return f'{self.var} = bitcast {TYPE_NAMES[self.type]} {self.val} to {TYPE_NAMES[self.new_type]}'
 
-@dataclass
+@slotted
+class StmtInsertValue:
+    var: Reg
+    type: Type
+    agg: object
+    elem_type: Type
+    elem: object
+    idx: int
+
+    def uses(self):
+        return [self.agg, self.elem]
+
+    def replace_uses(self, f):
+        self.agg = f(self.agg)
+        self.elem = f(self.elem)
+
+    def __str__(self):
+        return f'{self.var} = insertvalue {TYPE_NAMES[self.type]} {self.agg}, {TYPE_NAMES[self.elem_type]} {self.elem}, {self.idx}'
+
+@slotted
 class StmtLoad:
-    var: str
-    type: str
-    addr: str
+    var: Reg
+    type: Type
+    addr: Reg
     noopt: bool = False  # True will prevent this statement from getting removed by the optimizer
 
+    def uses(self):
+        return [self.addr]
+
+    def replace_uses(self, f):
+        self.addr = f(self.addr)
+
     def __str__(self):
-        return f'{self.var} = load {self.type}, {self.type}* {self.addr}'
+        t = TYPE_NAMES[self.type]
+        return f'{self.var} = load {t}, {t}* {self.addr}'
 
-@dataclass
+@slotted
 class StmtStore:
-    type: str
+    type: Type
     val: object
-    addr: str
+    addr: Reg
     noopt: bool = False
 
+    def uses(self):
+        return [self.val, self.addr]
+
+    def replace_uses(self, f):
+        self.val = f(self.val)
+        self.addr = f(self.addr)
+
     def __str__(self):
-        return f'store {self.type} {self.val}, {self.type}* {self.addr}'
+        t = TYPE_NAMES[self.type]
+        return f'store {t} {self.val}, {t}* {self.addr}'
 
 @dataclass
 class StrLit:
+    """string constant laid out like strings of the runtime: its length followed by null-terminated characters"""
     string: str
 
     def __len__(self):
         return len(self.string) - len(re.findall('\\\\n|\\\\"', self.string)) + 1
 
     def __str__(self):
-        return 'c"' + self.string.replace('\\n', '\\0A').replace('\\"', '\\22') + '\\00"'
+        chars = 'c"' + self.string.replace('\\n', '\\0A').replace('\\"', '\\22') + '\\00"'
+        return f'{{{TYPE_I64} {len(self) - 1}, {self.chars_type} {chars}}}'
 
     @property
-    def type(self):
+    def chars_type(self):
         return f'[{len(self)} x {TYPE_I8}]'
 
-@dataclass
+    @property
+    def type(self):
+        return f'{{{TYPE_I64}, {self.chars_type}}}'
+
+@slotted
 class StmtGetElementPtr:
-    var: str
-    type: str
-    addr: str
+    var: Reg
+    type: object  # Type or type of a string literal
+    addr: object  # register or name of a global
     idx: list
 
+    def uses(self):
+        return [self.addr] + [v for _, v in self.idx]
+
+    def replace_uses(self, f):
+        self.addr = f(self.addr)
+        self.idx = [(t, f(v)) for t, v in self.idx]
+
     def __str__(self):
-        return f'{self.var} = getelementptr {self.type}, {self.type}* {self.addr}, ' + ', '.join(f'{t} {i}' for t, i in self.idx)
+        return f'{self.var} = getelementptr {self.type}, {self.type}* {self.addr}, ' + ', '.join(f'{TYPE_NAMES[t]} {i}' for t, i in self.idx)
 
-@dataclass
+@slotted
 class StmtReturn:
-    type: str
+    type: Type
     val: object
 
+    def uses(self):
+        return [self.val]
+
+    def replace_uses(self, f):
+        self.val = f(self.val)
+
     def __str__(self):
-        return f'ret {self.type} {self.val}'
+        return f'ret {TYPE_NAMES[self.type]} {self.val}'
 
-@dataclass
+@slotted
 class StmtVoidReturn:
+    def uses(self):
+        return []
+
+    def replace_uses(self, f):
+        pass
+
     def __str__(self):
         return f'ret {TYPE_VOID}'
 
-@dataclass
+@slotted
 class StmtJump:
-    label: str
+    label: int
+
+    def uses(self):
+        return []
+
+    def replace_uses(self, f):
+        pass
 
     def __str__(self):
-        return f'br label %{self.label}'
+        return f'br label %L{self.label}'
 
-@dataclass
+@slotted
 class StmtCondJump:
     cond: object
-    tlabel: str
-    flabel: str
+    tlabel: int
+    flabel: int
+
+    def uses(self):
+        return [self.cond]
+
+    def replace_uses(self, f):
+        self.cond = f(self.cond)
 
     def __str__(self):
-        return f'br i1 {self.cond}, label %{self.tlabel}, label %{self.flabel}'
+        return f'br i1 {self.cond}, label %L{self.tlabel}, label %L{self.flabel}'
 
-@dataclass
+@slotted
 class StmtPhi:
-    var: str
-    type: str
-    vals: list
+    var: Reg
+    type: Type
+    vals: list  # tuples (value, label of predecessor)
+
+    def uses(self):
+        return [v for v, _ in self.vals]
+
+    def replace_uses(self, f):
+        self.vals = [(f(v), lbl) for v, lbl in self.vals]
 
     def __str__(self):
-        return f'{self.var} = phi {self.type} ' + ', '.join(f'[{v[0]}, %{v[1]}]' for v in self.vals)
+        return f'{self.var} = phi {TYPE_NAMES[self.type]} ' + ', '.join(f'[{v}, %L{label}]' for v, label in self.vals)
 
 @dataclass
 class GlobalDef:
@@ -165,29 +346,78 @@ class GlobalDef:
 
 @dataclass
 class FunDecl:
-    type: str
+    type: Type
     id: str
     args: list
 
 @dataclass
 class BuiltinFunDecl(FunDecl):
+    def write(self, out):
+        out.write(f'{self}\n')
+
     def __str__(self):
-        return f'declare {self.type} @{self.id}(' + ', '.join(self.args) + ')'
+        return f'declare {self.type} @{self.id}(' + ', '.join(map(str, self.args)) + ')'
 
 @dataclass
 class TopDef(FunDecl):
     blocks: list
+    next_id: int  # ids of registers and labels of blocks are taken from the same counter
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def new_reg(self):
+        return Reg(self.new_id())
+
+    def __getstate__(self):
+        # blocks reference each other through preds/succs, pickling them directly would recurse along the whole graph
+        state = self.__dict__.copy()
+        state['blocks'] = [(b.label, b.stmts, [p.label for p in b.preds], [s.label for s in b.succs]) for b in self.blocks]
+        return state
+
+    def __setstate__(self, state):
+        label2block = {}
+        for label, stmts, _, _ in state['blocks']:
+            label2block[label] = Block(label)
+            label2block[label].stmts = stmts
+        for label, _, preds, succs in state['blocks']:
+            label2block[label].preds = [label2block[p] for p in preds]
+            label2block[label].succs = [label2block[s] for s in succs]
+        self.__dict__.update(state, blocks=[label2block[b[0]] for b in state['blocks']])
+
+    def write(self, out):
+        out.write(f'define {self.type} @{self.id}(' + ', '.join(f'{a[0]} {a[1]}' for a in self.args) + ') {\n')
+        for b in self.blocks:
+            b.write(out)
+        out.write('}\n')
 
     def __str__(self):
-        return f'define {self.type} @{self.id}(' + ', '.join(f'{a[0]} {a[1]}' for a in self.args) + ') {\n'\
-               + '\n'.join(str(s) for s in self.blocks)\
-               + '\n}'
+        return written(self)
 
 @dataclass
 class Program:
     topdefs: list
     globals: list
 
+    def write(self, out):
+        """writes functions followed by definitions of globals, the same order is used when streaming"""
+        for d in self.topdefs:
+            d.write(out)
+        write_globals(self.globals, out)
+
     def __str__(self):
-        return '\n'.join(str(g) for g in self.globals) + '\n'\
-            + '\n'.join(str(d) for d in self.topdefs)
+        return written(self)
+
+
+def write_globals(globals, out):
+    for g in globals:
+        out.write(f'{g}\n')
+
+
+def written(x):
+    """returns text written by x.write()"""
+    out = io.StringIO()
+    x.write(out)
+    return out.getvalue()
+
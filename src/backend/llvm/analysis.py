@@ -0,0 +1,275 @@
+"""
+control flow analyses of functions
+
+all of them are iterative (no recursion along the control flow graph), so they work for functions of any size
+"""
+from collections import Counter
+import stats
+import backend.llvm as llvm
+
+HEAP = 'heap'  # memory region of everything except allocas
+
+
+def defined_register(s):
+    """returns register defined by the statement or None"""
+    if isinstance(s, llvm.StmtAlloc):
+        return s.addr
+    return getattr(s, 'var', None)
+
+
+class DefUse:
+    """index of statements defining and using registers in given blocks"""
+
+    def __init__(self, blocks):
+        self.defs = {}  # register -> (block, statement)
+        self.users = {}  # register -> list of (block, statement)
+        for b in blocks:
+            for s in b.stmts:
+                self.add(b, s)
+
+    def add(self, b: llvm.Block, s):
+        var = defined_register(s)
+        if var is not None:
+            self.defs[var] = b, s
+        for v in s.uses():
+            if isinstance(v, llvm.Reg):
+                self.users.setdefault(v, []).append((b, s))
+
+    def users_of(self, var):
+        return self.users.get(var, [])
+
+
+def reverse_postorder(f: llvm.TopDef):
+    """returns blocks reachable from the entry block in reverse postorder"""
+    entry = f.blocks[0]
+    visited = {entry}
+    order = []
+    stack = [(entry, iter(entry.succs))]
+    while stack:
+        b, succs = stack[-1]
+        for s in succs:
+            if s not in visited:
+                visited.add(s)
+                stack.append((s, iter(s.succs)))
+                break
+        else:
+            stack.pop()
+            order.append(b)
+    order.reverse()
+    return order
+
+
+def remove_pred(b: llvm.Block, pred: llvm.Block):
+    """removes all edges from pred to b together with their phi incoming values"""
+    b.preds = [p for p in b.preds if p is not pred]
+    for s in b.stmts:
+        if isinstance(s, llvm.StmtPhi):
+            s.vals = [(v, lbl) for v, lbl in s.vals if lbl != pred.label]
+
+
+def jump_targets(s):
+    """returns labels of blocks the statement jumps to"""
+    if isinstance(s, llvm.StmtJump):
+        return [s.label]
+    elif isinstance(s, llvm.StmtCondJump):
+        return [s.tlabel, s.flabel]
+    return []
+
+
+def split_block(b: llvm.Block, i, label):
+    """
+    moves statements of block b starting from the i-th one to a new block with given label, which takes over
+    successors of b, and returns it (b is left without successors and a terminator)
+    """
+    new = llvm.Block(label)
+    new.stmts = b.stmts[i:]
+    new.succs = b.succs
+    for s in set(new.succs):
+        s.preds = [new if p is b else p for p in s.preds]
+        for phi in s.stmts:
+            if isinstance(phi, llvm.StmtPhi):
+                phi.vals = [(v, label if lbl == b.label else lbl) for v, lbl in phi.vals]
+    b.stmts = b.stmts[:i]
+    b.succs = []
+    return new
+
+
+def update_edges(f: llvm.TopDef):
+    """
+    recomputes successors of blocks from their last statements and removes predecessors (and phi incoming
+    values) of edges that no longer exist, the remaining ones are kept in the same order
+    """
+    label2block = dict((b.label, b) for b in f.blocks)
+    incoming = dict((b, Counter()) for b in f.blocks)
+    for b in f.blocks:
+        b.succs = [label2block[lbl] for lbl in jump_targets(b.stmts[-1])]
+        for s in b.succs:
+            incoming[s][b.label] += 1
+
+    def kept(labels):
+        left = Counter(incoming[b])
+        for lbl in labels:
+            if left[lbl] > 0:
+                left[lbl] -= 1
+                yield True
+            else:
+                yield False
+
+    for b in f.blocks:
+        b.preds = [p for p, keep in zip(b.preds, kept(p.label for p in b.preds)) if keep]
+        for s in b.stmts:
+            if isinstance(s, llvm.StmtPhi):
+                s.vals = [val for val, keep in zip(s.vals, kept(lbl for _, lbl in s.vals)) if keep]
+
+
+def remove_unreachable_blocks(f: llvm.TopDef):
+    """removes blocks not reachable from the entry block, returns the remaining blocks in reverse postorder"""
+    rpo = reverse_postorder(f)
+    if len(rpo) < len(f.blocks):
+        reachable = set(rpo)
+        for b in f.blocks:
+            if b not in reachable:
+                for s in b.succs:
+                    if s in reachable:
+                        remove_pred(s, b)
+        f.blocks = [b for b in f.blocks if b in reachable]
+    return rpo
+
+
+def dominators(rpo):
+    """
+    returns immediate dominators of blocks given in reverse postorder (the entry block is its own dominator)
+    Cooper, Harvey, Kennedy - A Simple, Fast Dominance Algorithm
+    """
+    index = dict((b, i) for i, b in enumerate(rpo))
+    idom = {rpo[0]: rpo[0]}
+
+    def intersect(a, b):
+        while a is not b:
+            while index[a] > index[b]:
+                a = idom[a]
+            while index[b] > index[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+        stats.count('dominator iterations')
+        for b in rpo[1:]:
+            new_idom = None
+            for p in b.preds:
+                if p in idom:
+                    new_idom = p if new_idom is None else intersect(p, new_idom)
+            if idom.get(b) is not new_idom:
+                idom[b] = new_idom
+                changed = True
+    return idom
+
+
+def dominator_tree(rpo, idom):
+    """returns map block -> list of blocks it immediately dominates (in reverse postorder)"""
+    children = dict((b, []) for b in rpo)
+    for b in rpo[1:]:
+        children[idom[b]].append(b)
+    return children
+
+
+def dominance_frontiers(rpo, idom):
+    """returns map block -> set of blocks in its dominance frontier"""
+    df = dict((b, set()) for b in rpo)
+    for b in rpo:
+        if len(b.preds) < 2:
+            continue
+        for p in set(b.preds):
+            runner = p
+            while runner is not idom[b]:
+                df[runner].add(b)
+                runner = idom[runner]
+    return df
+
+
+def dominates(a, b, idom):
+    """returns True if block a dominates block b"""
+    while b is not a:
+        if idom[b] is b:
+            return False
+        b = idom[b]
+    return True
+
+
+def dominator_tree_numbers(rpo, idom):
+    """
+    returns maps of blocks to their preorder and postorder numbers in a depth first traversal of the dominator tree,
+    block a dominates block b if and only if pre[a] <= pre[b] and post[b] <= post[a]
+    """
+    children = dominator_tree(rpo, idom)
+    pre = {rpo[0]: 0}
+    post = {}
+    n = 1
+    stack = [(rpo[0], iter(children[rpo[0]]))]
+    while stack:
+        b, it = stack[-1]
+        for c in it:
+            pre[c] = n
+            n += 1
+            stack.append((c, iter(children[c])))
+            break
+        else:
+            stack.pop()
+            post[b] = n
+            n += 1
+    return pre, post
+
+
+def natural_loops(rpo, idom):
+    """
+    returns list of tuples (header, set of blocks) of natural loops of back edges (loops with the same header
+    are merged), inner loops come before loops containing them
+    """
+    pre, post = dominator_tree_numbers(rpo, idom)
+    loops = {}
+    for b in rpo:
+        for p in b.preds:
+            if pre[b] <= pre[p] and post[p] <= post[b]:  # b dominates p
+                body = loops.setdefault(b, {b})
+                work = [p]
+                while work:
+                    x = work.pop()
+                    if x not in body:
+                        body.add(x)
+                        work.extend(x.preds)
+    return sorted(loops.items(), key=lambda loop: len(loop[1]))
+
+
+def memory_regions(rpo):
+    """
+    returns function mapping address to the region of memory it points to: allocas left after promoting
+    local variables (array structs) are separate regions, their addresses are never passed to other functions,
+    all other memory (array elements) is one region
+    """
+    allocas = set()
+    geps = {}
+    for b in rpo:
+        for s in b.stmts:
+            if isinstance(s, llvm.StmtAlloc):
+                allocas.add(s.addr)
+            elif isinstance(s, llvm.StmtGetElementPtr):
+                geps[s.var] = s.addr
+
+    def region(addr):
+        addr = geps.get(addr, addr)
+        return addr if addr in allocas else HEAP
+    return region, sorted(allocas, key=llvm.operand_order) + [HEAP]
+
+
+def stored_regions(blocks, region):
+    """returns set of memory regions that can be changed by statements of given blocks"""
+    stored = set()
+    for b in blocks:
+        for s in b.stmts:
+            if isinstance(s, llvm.StmtStore):
+                stored.add(region(s.addr))
+            elif isinstance(s, llvm.StmtCall):
+                stored.add(HEAP)
+    return stored
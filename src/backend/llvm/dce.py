@@ -0,0 +1,71 @@
+"""
+dead code and dead store elimination
+
+statements are removed when nothing they compute is used (mark and sweep from statements with side effects,
+so cycles of phis using only each other are removed too) and stores when no load can read the stored value
+"""
+import backend.llvm as llvm
+import backend.llvm.analysis as analysis
+import backend.llvm.licm as licm
+
+EFFECTS = (llvm.StmtCall, llvm.StmtStore, llvm.StmtJump, llvm.StmtCondJump, llvm.StmtReturn, llvm.StmtVoidReturn)
+
+
+def has_effects(s):
+    """returns True if the statement has to be executed even if its result is unused"""
+    if isinstance(s, llvm.StmtBinOp):
+        return not licm.can_speculate(s)  # division by zero
+    return isinstance(s, EFFECTS)
+
+
+def remove_dead_code(rpo, index: analysis.DefUse):
+    """removes statements whose results are not used by statements with effects (directly or not)"""
+    live = set()
+    work = []
+    for b in rpo:
+        for s in b.stmts:
+            if has_effects(s):
+                live.add(id(s))
+                work.append(s)
+    while work:
+        for v in work.pop().uses():
+            if v in index.defs:
+                _, d = index.defs[v]
+                if id(d) not in live:
+                    live.add(id(d))
+                    work.append(d)
+    changed = False
+    for b in rpo:
+        nstmts = [s for s in b.stmts if id(s) in live]
+        changed = changed or len(nstmts) < len(b.stmts)
+        b.stmts = nstmts
+    return changed
+
+
+def remove_dead_stores(rpo):
+    """
+    removes stores to allocas never loaded from and stores overwritten by a later store to the same address
+    in the same block before anything could read them (a load from the same region or a call for array elements)
+    """
+    region, _ = analysis.memory_regions(rpo)
+    loaded = set(region(s.addr) for b in rpo for s in b.stmts if isinstance(s, llvm.StmtLoad))
+    changed = False
+    for b in rpo:
+        dead = set()
+        pending = {}  # address -> last store to it not read yet
+        for s in b.stmts:
+            if isinstance(s, llvm.StmtStore):
+                if region(s.addr) not in loaded and region(s.addr) != analysis.HEAP:
+                    dead.add(id(s))
+                elif s.addr in pending:
+                    dead.add(id(pending[s.addr]))
+                pending[s.addr] = s
+            elif isinstance(s, llvm.StmtLoad):
+                r = region(s.addr)
+                pending = dict((a, p) for a, p in pending.items() if region(a) != r)
+            elif isinstance(s, llvm.StmtCall):
+                pending = dict((a, p) for a, p in pending.items() if region(a) != analysis.HEAP)
+        if dead:
+            b.stmts = [s for s in b.stmts if id(s) not in dead]
+            changed = True
+    return changed
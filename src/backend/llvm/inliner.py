@@ -0,0 +1,182 @@
+"""
+function inlining
+
+calls of small functions are replaced with copies of their bodies, functions are processed bottom-up along
+the call graph (callees before callers), so copied bodies already contain calls inlined into them;
+it runs on translated code (before mem2reg), so the copies are cleaned up by the following optimizations
+"""
+import copy
+import stats
+import backend.llvm as llvm
+import backend.llvm.analysis as analysis
+
+INLINE_BUDGET = 40  # maximal number of statements of inlined functions, 0 disables inlining
+CALLER_LIMIT = 2000  # callers are not grown beyond this number of statements
+RECURSION_LIMIT = 1  # number of times calls inside a recursive cycle of functions are inlined
+
+
+def call_graph(functions):
+    """returns map function id -> list of ids of given functions it calls (in order of first call)"""
+    graph = {}
+    for fid, f in functions.items():
+        graph[fid] = []
+        for b in f.blocks:
+            for s in b.stmts:
+                if isinstance(s, llvm.StmtCall) and s.fid in functions and s.fid not in graph[fid]:
+                    graph[fid].append(s.fid)
+    return graph
+
+
+def strongly_connected_components(graph):
+    """
+    returns strongly connected components of the graph in reverse topological order (components of called
+    functions come before components calling them), Tarjan's algorithm without recursion
+    """
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            v, succs = work[-1]
+            for w in succs:
+                if w not in index:
+                    index[w] = lowlink[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(graph[w])))
+                    break
+                elif w in on_stack:
+                    lowlink[v] = min(lowlink[v], index[w])
+            else:
+                work.pop()
+                if work:
+                    lowlink[work[-1][0]] = min(lowlink[work[-1][0]], lowlink[v])
+                if lowlink[v] == index[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+    return components
+
+
+def size(f: llvm.TopDef):
+    return sum(len(b.stmts) for b in f.blocks)
+
+
+def copy_stmt(s, rename, labels):
+    """returns copy of statement with registers renamed by rename and labels by the labels map"""
+    s = copy.copy(s)
+    s.replace_uses(rename)
+    if isinstance(s, llvm.StmtAlloc):
+        s.addr = rename(s.addr)
+    elif getattr(s, 'var', None):
+        s.var = rename(s.var)
+    if isinstance(s, llvm.StmtJump):
+        s.label = labels[s.label]
+    elif isinstance(s, llvm.StmtCondJump):
+        s.tlabel, s.flabel = labels[s.tlabel], labels[s.flabel]
+    elif isinstance(s, llvm.StmtPhi):
+        s.vals = [(v, labels[lbl]) for v, lbl in s.vals]
+    return s
+
+
+def inline_call(f: llvm.TopDef, b: llvm.Block, i, callee: llvm.TopDef):
+    """
+    replaces call b.stmts[i] with a copy of the callee body: registers of the callee are replaced with new
+    registers of f, its arguments with the passed values, blocks get new labels, returns become jumps to a new
+    block continuing b (where a phi merges returned values) and allocas are moved to the entry block of f
+    """
+    call = b.stmts[i]
+    regs = dict((v, arg) for (_, v), (_, arg) in zip(callee.args, call.args))
+
+    def rename(v):
+        if isinstance(v, llvm.Reg):
+            if v not in regs:
+                regs[v] = f.new_reg()
+            return regs[v]
+        return v
+
+    label_map = dict((c.label, f.new_id()) for c in callee.blocks)
+    cont = analysis.split_block(b, i + 1, f.new_id())
+
+    block_map = {}
+    allocas = []
+    returned = []
+    for c in callee.blocks:
+        nb = block_map[c] = llvm.Block(label_map[c.label])
+        for s in c.stmts:
+            s = copy_stmt(s, rename, label_map)
+            if isinstance(s, llvm.StmtAlloc):
+                allocas.append(s)
+                continue
+            elif isinstance(s, (llvm.StmtReturn, llvm.StmtVoidReturn)):
+                returned.append((getattr(s, 'val', None), nb.label))
+                s = llvm.StmtJump(cont.label)
+                cont.preds.append(nb)
+            nb.stmts.append(s)
+    for c in callee.blocks:
+        block_map[c].preds = [block_map[p] for p in c.preds]
+        block_map[c].succs = [block_map[s] for s in c.succs]
+    for nb in cont.preds:
+        nb.succs = [cont]
+    if call.var:
+        cont.stmts.insert(0, llvm.StmtPhi(call.var, call.type, returned))
+
+    entry = block_map[callee.blocks[0]]
+    b.stmts[i] = llvm.StmtJump(entry.label)
+    b.succs = [entry]
+    entry.preds.append(b)
+    pos = f.blocks.index(b) + 1
+    f.blocks[pos:pos] = [block_map[c] for c in callee.blocks] + [cont]
+    f.blocks[0].stmts[:0] = allocas
+
+
+def inline_calls(f: llvm.TopDef, callees, budget):
+    """inlines calls (present before inlining) of functions from the callees map if they fit in the budget"""
+    sites = []
+    for b in f.blocks:
+        sites.extend((b, s) for s in b.stmts if isinstance(s, llvm.StmtCall) and s.fid in callees)
+    total = size(f)
+    # later calls in a block are inlined first, so splitting the block doesn't move earlier ones
+    for b, call in reversed(sites):
+        callee = callees[call.fid]
+        n = size(callee)
+        if n <= budget and total + n <= CALLER_LIMIT:
+            i = next(i for i, s in enumerate(b.stmts) if s is call)  # allocas could be added before it
+            inline_call(f, b, i, callee)
+            total += n
+            stats.count('inlined calls')
+
+
+def inline_functions(functions, budget=INLINE_BUDGET, recursion_limit=RECURSION_LIMIT):
+    """
+    inlines calls of functions having at most budget statements into the given functions (changed in place),
+    calls between functions of one recursive cycle are inlined recursion_limit times
+    """
+    defined = dict((f.id, f) for f in functions if isinstance(f, llvm.TopDef))
+    if budget <= 0:
+        return
+    graph = call_graph(defined)
+    done = {}  # functions of already processed components
+    for component in strongly_connected_components(graph):
+        for fid in component:
+            inline_calls(defined[fid], done, budget)
+        recursive = dict((fid, defined[fid]) for fid in component)
+        if len(component) > 1 or component[0] in graph[component[0]]:
+            originals = dict((fid, copy.deepcopy(f)) for fid, f in recursive.items())
+            for _ in range(recursion_limit):
+                for fid in component:
+                    inline_calls(defined[fid], originals, budget)
+        done.update(recursive)
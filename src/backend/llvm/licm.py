@@ -0,0 +1,112 @@
+"""
+loop invariant code motion
+
+computations whose operands don't change inside a natural loop are moved to the preheader of the loop
+(a block outside the loop jumping only to its header, created if necessary)
+"""
+import backend.llvm as llvm
+import backend.llvm.analysis as analysis
+
+PURE_STMTS = (llvm.StmtBinOp, llvm.StmtGetElementPtr, llvm.StmtBitcast, llvm.StmtInsertValue)
+
+
+def hoist_allocas(f: llvm.TopDef):
+    """moves allocas to the entry block, so declarations inside loops don't grow the stack on every iteration"""
+    allocas = []
+    for b in f.blocks[1:]:
+        allocas.extend(s for s in b.stmts if isinstance(s, llvm.StmtAlloc))
+        b.stmts = [s for s in b.stmts if not isinstance(s, llvm.StmtAlloc)]
+    f.blocks[0].stmts[:0] = allocas
+
+
+def can_speculate(s):
+    """returns True if the statement can be executed even if it wouldn't be executed in the loop"""
+    if isinstance(s, llvm.StmtBinOp) and s.op in (llvm.OP_DIV, llvm.OP_REM):
+        return isinstance(s.arg2, int) and s.arg2 not in (0, -1)
+    return isinstance(s, PURE_STMTS)
+
+
+def create_preheader(f: llvm.TopDef, header: llvm.Block, body, label):
+    """
+    inserts block with given label before the loop header, jumps from outside of the loop are redirected to it
+    and header phis get a single value from it (merged by a phi in the preheader if necessary)
+    """
+    pre = llvm.Block(label)
+    outside = [p for p in header.preds if p not in body]
+    for s in header.stmts:
+        if not isinstance(s, llvm.StmtPhi):
+            break
+        labels = set(p.label for p in outside)
+        vals = [(v, lbl) for v, lbl in s.vals if lbl in labels]
+        if len(set(v for v, _ in vals)) == 1:
+            v = vals[0][0]
+        else:
+            v = f.new_reg()
+            pre.stmts.append(llvm.StmtPhi(v, s.type, vals))
+        s.vals = [(v2, lbl) for v2, lbl in s.vals if lbl not in labels] + [(v, label)]
+    pre.stmts.append(llvm.StmtJump(header.label))
+
+    for p in set(outside):
+        jump = p.stmts[-1]
+        if isinstance(jump, llvm.StmtJump):
+            jump.label = label
+        else:
+            jump.tlabel = label if jump.tlabel == header.label else jump.tlabel
+            jump.flabel = label if jump.flabel == header.label else jump.flabel
+        p.succs = [pre if s is header else s for s in p.succs]
+    pre.preds = outside
+    pre.succs = [header]
+    header.preds = [p for p in header.preds if p in body] + [pre]
+    f.blocks.insert(f.blocks.index(header), pre)
+    return pre
+
+
+def hoist_loop_invariants(f: llvm.TopDef, rpo):
+    """moves loop invariant statements to preheaders (inner loops first), returns True if anything was moved"""
+    idom = analysis.dominators(rpo)
+    index = dict((b, i) for i, b in enumerate(rpo))
+    region, _ = analysis.memory_regions(rpo)
+    loops = analysis.natural_loops(rpo, idom)
+    changed = False
+
+    for header, body in loops:
+        defined = set(s.var for b in body for s in b.stmts if getattr(s, 'var', None))
+        stored = analysis.stored_regions(body, region)
+        exits = [b for b in body if any(s not in body for s in b.succs)]
+
+        def invariant(s, b):
+            if not all(isinstance(v, int) or v not in defined for v in s.uses()):
+                return False
+            if isinstance(s, llvm.StmtLoad):
+                r = region(s.addr)
+                # allocas can always be read, other memory only if the load would be executed anyway
+                return r not in stored and (r != analysis.HEAP or (
+                    len(exits) > 0 and all(analysis.dominates(b, e, idom) for e in exits)))
+            return can_speculate(s)
+
+        hoisted = []
+        for b in sorted(body, key=index.__getitem__):
+            nstmts = []
+            for s in b.stmts:
+                if invariant(s, b):
+                    hoisted.append(s)
+                    defined.discard(s.var)
+                else:
+                    nstmts.append(s)
+            b.stmts = nstmts
+        if len(hoisted) == 0:
+            continue
+        changed = True
+
+        outside = set(p for p in header.preds if p not in body)
+        if len(outside) == 1 and len(next(iter(outside)).succs) == 1:
+            pre = next(iter(outside))
+        else:
+            pre = create_preheader(f, header, body, f.new_id())
+            idom[pre], idom[header] = idom[header], pre
+            index[pre] = index[header] - 0.5
+            for _, body2 in loops:
+                if header in body2 and body2 is not body:
+                    body2.add(pre)
+        pre.stmts[-1:-1] = hoisted
+    return changed
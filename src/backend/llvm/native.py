@@ -0,0 +1,82 @@
+"""
+native code generation with llvmlite (an optional dependency, imported when first used)
+
+generated code is linked with the runtime library and optimized by LLVM passes in process,
+then written as an object file or bitcode, or compiled by the JIT and executed
+"""
+import ctypes
+import os
+import sys
+
+RUNTIME = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'lib', 'runtime.bc'))
+OPT_LEVELS = (0, 1, 2, 3)
+
+_binding = None
+
+
+def binding():
+    """returns llvmlite.binding initialized for the native target"""
+    global _binding
+    if _binding is None:
+        try:
+            import llvmlite.binding as b
+        except ImportError:
+            raise ImportError('native code generation requires llvmlite (pip install llvmlite)') from None
+        if not hasattr(b, 'create_pass_builder'):
+            b.initialize()  # versions with the legacy pass manager only have to be initialized explicitly
+        b.initialize_native_target()
+        b.initialize_native_asmprinter()
+        _binding = b
+    return _binding
+
+
+def target_machine(level):
+    b = binding()
+    return b.Target.from_default_triple().create_target_machine(opt=level, reloc='pic')
+
+
+def build_module(ir, machine, runtime=RUNTIME):
+    """returns verified module of LLVM code (text) linked with the runtime library (bitcode) if it is given"""
+    b = binding()
+    module = b.parse_assembly(ir)
+    if runtime is not None:
+        with open(runtime, 'rb') as f:
+            module.link_in(b.parse_bitcode(f.read()))
+    module.triple = machine.triple
+    module.data_layout = str(machine.target_data)
+    module.verify()
+    return module
+
+
+def optimize(module, machine, level):
+    """runs the standard LLVM pipeline of optimization level (0-3) on the module"""
+    b = binding()
+    if level == 0:
+        return
+    if hasattr(b, 'create_pass_builder'):
+        builder = b.create_pass_builder(machine, b.create_pipeline_tuning_options(speed_level=level))
+        builder.getModulePassManager().run(module, builder)
+    else:
+        builder = b.create_pass_manager_builder()
+        builder.opt_level = level
+        manager = b.create_module_pass_manager()
+        builder.populate(manager)
+        manager.run(module)
+
+
+def emit(module, machine, kind):
+    """returns bytes of object file ('obj') or bitcode ('bc') of the module"""
+    return machine.emit_object(module) if kind == 'obj' else module.as_bitcode()
+
+
+def run(module, machine):
+    """compiles the module by the JIT and runs its main function, returns its result"""
+    engine = binding().create_mcjit_compiler(module, machine)
+    engine.finalize_object()
+    engine.run_static_constructors()
+    main = ctypes.CFUNCTYPE(ctypes.c_int64)(engine.get_function_address('main'))
+    sys.stdout.flush()
+    try:
+        return main()
+    finally:
+        ctypes.CDLL(None).fflush(None)  # output of the runtime library is buffered by C stdio
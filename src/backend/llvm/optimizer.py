@@ -1,176 +1,358 @@
+import stats
 import backend.llvm as llvm
-import backend.llvm.translator as translator
-from dataclasses import dataclass
+import backend.llvm.analysis as analysis
+import backend.llvm.dce as dce
+import backend.llvm.inliner as inliner
+import backend.llvm.licm as licm
+import backend.llvm.sccp as sccp
+import backend.llvm.tailcalls as tailcalls
 from itertools import count
 
-BIN_OPS = dict((v, k) for k, v in translator.BIN_OPS.items())
 
-def optimize_function(f: llvm.TopDef):
-    """replaces alloc/store/load statements with register operations"""
-    id_gens = {}
-    label2block = dict((b.label, b) for b in f.blocks)
-    phi_map = dict((b, {}) for b in f.blocks)
-
-    def get_live_vars(b: llvm.Block):
-        dead = {}
-        live = {}
+class StmtLocalPhi(llvm.StmtPhi):
+    """
+    used to differentiate new phi statements used for computing values of local variables
+    from phi statements added earlier used for computing boolean expressions
+    """
+    pass
+
+
+class Values:
+    """map of registers to values replacing them, chains of replacements are compressed when followed"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def replace(self, var, val):
+        self.parent[var] = val
+
+    def __getitem__(self, v):
+        root = v
+        while root in self.parent:
+            root = self.parent[root]
+        while v in self.parent and self.parent[v] != root:
+            self.parent[v], v = root, self.parent[v]
+        return root
+
+
+def place_phis(rpo, allocs):
+    """
+    inserts phis (without values) for promoted variables at the iterated dominance frontiers of blocks
+    storing them, but only where the variable is live (pruned SSA form)
+    returns immediate dominators and map block -> list of (variable, phi)
+    """
+    idom = analysis.dominators(rpo)
+    df = analysis.dominance_frontiers(rpo, idom)
+    defs = dict((v, set()) for v in allocs)
+    uses = dict((v, set()) for v in allocs)  # blocks loading the variable before storing it
+    for b in rpo:
+        stored = set()
         for s in b.stmts:
-            if isinstance(s, llvm.StmtLoad) and not s.noopt and s.addr not in dead:
-                live[s.addr] = s.type
-            elif isinstance(s, llvm.StmtStore) and not s.noopt:
-                dead[s.addr] = s.type
-        return live
-
-    class StmtLocalPhi(llvm.StmtPhi):
-        """
-        used to differentiate new phi statements used for computing values of local variables
-        from phi statements added earlier used for computing boolean expressions
-        """
-        pass
-
-    for b in f.blocks:  # insert phis
-        if len(b.preds) == 0:
-            continue
-        lvs = get_live_vars(b)
+            if isinstance(s, llvm.StmtLoad) and s.addr in allocs and s.addr not in stored:
+                uses[s.addr].add(b)
+            elif isinstance(s, llvm.StmtStore) and s.addr in allocs:
+                stored.add(s.addr)
+                defs[s.addr].add(b)
 
-        # add phis for all variables live at the start of the block
-        for lv, lvtype in lvs.items():
-            b.stmts.insert(0, StmtLocalPhi(lv, lvtype, [(lv, p.label) for p in b.preds]))
+    phis = dict((b, []) for b in rpo)
+    for v, t in allocs.items():
+        live = set(uses[v])
+        work = list(live)
+        while work:
+            b = work.pop()
+            for p in b.preds:
+                if p not in live and p not in defs[v]:
+                    live.add(p)
+                    work.append(p)
 
-    def fresh_loc(v):
-        if v not in id_gens:
-            id_gens[v] = count(1)
-        return f'{v}.{id_gens[v].__next__()}'
+        placed = set()
+        work = list(defs[v])
+        while work:
+            for y in df[work.pop()]:
+                if y in live and y not in placed:
+                    placed.add(y)
+                    phis[y].append((v, StmtLocalPhi(v, t, [(None, p.label) for p in y.preds])))
+                    stats.count('phis inserted')
+                    if y not in defs[v]:
+                        work.append(y)
+    for b in rpo:
+        b.stmts[:0] = [phi for _, phi in phis[b]]
+    return idom, phis
+
+
+def promote_allocas(f: llvm.TopDef, rpo, values: Values):
+    """
+    replaces alloc/store/load statements of local variables with register operations
+    (SSA construction by Cytron et al. with iterative renaming along the dominator tree),
+    loaded registers are mapped to stored values in values
+    """
+    allocs = {}
+    for b in rpo:
+        for s in b.stmts:
+            if isinstance(s, llvm.StmtAlloc) and not s.noopt:
+                allocs[s.addr] = s.type
+    if len(allocs) == 0:
+        return
+    idom, phis = place_phis(rpo, allocs)
+    children = analysis.dominator_tree(rpo, idom)
 
-    @dataclass
-    class StmtAss:
-        """fake assignment statement (%dst := %src)"""
-        dst: str
-        src: object
+    current = dict((v, []) for v in allocs)  # stacks of values of variables
 
-        def __str__(self):
-            return f'{self.dst} = {self.src}'
+    def value(v):
+        return current[v][-1] if current[v] else 'undef'
 
-    for b in f.blocks:  # ssaify
+    stack = [(rpo[0], None)]
+    while stack:
+        b, defined = stack.pop()
+        if defined is not None:  # leaving block b
+            for v in defined:
+                current[v].pop()
+            continue
+        defined = []
+        for v, phi in phis[b]:
+            phi.var = f.new_reg()
+            current[v].append(phi.var)
+            defined.append(v)
         nstmts = []
-        pm = phi_map[b]
         for s in b.stmts:
-            if isinstance(s, llvm.StmtStore) and not s.noopt:
-                pm[s.addr] = fresh_loc(s.addr)
-                nstmts.append(StmtAss(pm[s.addr], s.val))
-            elif isinstance(s, StmtLocalPhi):
-                pm[s.var] = fresh_loc(s.var)
-                nstmts.append(StmtLocalPhi(pm[s.var], s.type, s.vals))
-            elif isinstance(s, llvm.StmtLoad) and not s.noopt:
-                nstmts.append(StmtAss(s.var, pm[s.addr]))
-            elif isinstance(s, llvm.StmtAlloc) and not s.noopt:
-                pass
-            else:
+            if isinstance(s, llvm.StmtStore) and s.addr in allocs:
+                current[s.addr].append(s.val)
+                defined.append(s.addr)
+            elif isinstance(s, llvm.StmtLoad) and s.addr in allocs:
+                values.replace(s.var, value(s.addr))
+            elif not (isinstance(s, llvm.StmtAlloc) and s.addr in allocs):
                 nstmts.append(s)
         b.stmts = nstmts
+        for succ in set(b.succs):
+            for v, phi in phis[succ]:
+                phi.vals = [(value(v), lbl) if lbl == b.label else (val, lbl) for val, lbl in phi.vals]
+        stack.append((b, defined))
+        stack.extend((c, None) for c in reversed(children[b]))
+
 
-    extra_phis = dict((b, []) for b in f.blocks)
-
-    def get_phi_val(b: llvm.Block, t, v):
-        """
-        - recursively finds value for phi statement in block's predecessors
-        - remembers extra phi statements to be added if necessary
-        """
-        try:
-            return phi_map[b][v]
-        except KeyError:
-            nv = fresh_loc(v)
-            phi_map[b][v] = nv
-            phi_vals = [(get_phi_val(p, t, v), p.label) for p in b.preds]
-            extra_phis[b].append(StmtLocalPhi(nv, t, phi_vals))
-            return nv
-
-    for b in f.blocks:  # fix phis
+def remove_trivial_phis(rpo, values: Values):
+    """
+    removes phis whose incoming values are all the same (apart from the phi itself), mapping them
+    to that value, phis using removed ones are checked again
+    """
+    users = {}
+    work = []
+    for b in rpo:
         for s in b.stmts:
-            if isinstance(s, StmtLocalPhi):
-                s.vals = [(get_phi_val(label2block[lbl], s.type, v), lbl) for v, lbl in s.vals]
+            if isinstance(s, llvm.StmtPhi):
+                s.replace_uses(values.__getitem__)
+                for v in s.uses():
+                    users.setdefault(v, []).append(s)
+                work.append(s)
+    work.reverse()
+    removed = set()
+    while work:
+        phi = work.pop()
+        if id(phi) in removed:
+            continue
+        same = None
+        for v in phi.uses():
+            v = values[v]
+            if v == phi.var or v == same:
+                continue
+            if same is not None:
+                break
+            same = v
+        else:
+            same = 'undef' if same is None else same
+            values.replace(phi.var, same)
+            removed.add(id(phi))
+            stats.count('phis removed')
+            phi_users = users.pop(phi.var, [])
+            users.setdefault(same, []).extend(phi_users)
+            work.extend(phi_users)
+    for b in rpo:
+        b.stmts = [s for s in b.stmts if id(s) not in removed]
 
-    for b in f.blocks:  # add extra phis
-        b.stmts = extra_phis[b] + b.stmts
 
-    def get_val(v):
-        if v not in var_map:
-            return v
-        return get_val(var_map[v])
+def replace_values(rpo, values: Values):
+    for b in rpo:
+        for s in b.stmts:
+            s.replace_uses(values.__getitem__)
+
 
-    def get_vals(b: llvm.Block):
+def merge_blocks(f: llvm.TopDef, rpo, values: Values):
+    """
+    appends blocks having a single predecessor to the predecessor if it jumps only to them (removing chains
+    of jumps left by inlining and constant propagation), returns the remaining blocks in reverse postorder
+    """
+    merged = set()
+    for b in rpo[1:]:
+        if len(b.preds) != 1 or len(b.preds[0].succs) != 1 or b.preds[0] is b:
+            continue
+        p = b.preds[0]
         for s in b.stmts:
-            if isinstance(s, llvm.StmtBinOp):
-                s.arg1 = get_val(s.arg1)
-                s.arg2 = get_val(s.arg2)
-            elif isinstance(s, llvm.StmtCall):
-                s.args = [(t, get_val(v)) for t, v in s.args]
-            elif isinstance(s, llvm.StmtReturn):
-                s.val = get_val(s.val)
-            elif isinstance(s, llvm.StmtCondJump):
-                s.cond = get_val(s.cond)
-            elif isinstance(s, llvm.StmtPhi):
-                s.vals = [(get_val(v), lbl) for v, lbl in s.vals]
-            elif isinstance(s, llvm.StmtAllocArray):
-                s.count = get_val(s.count)
-            elif isinstance(s, llvm.StmtLoad):
-                s.addr = get_val(s.addr)
-            elif isinstance(s, llvm.StmtStore):
-                s.val = get_val(s.val)
-                s.addr = get_val(s.addr)
-            elif isinstance(s, llvm.StmtGetElementPtr):
-                s.addr = get_val(s.addr)
-                s.idx = [(t, get_val(v)) for t, v in s.idx]
-
-    while True:
-        for b in f.blocks:  # replace trivial phis with assignments
-            nstmts = []
-            for s in b.stmts:
-                if isinstance(s, StmtLocalPhi):
-                    different_vals = set(v for v, _ in s.vals)
-                    if len(different_vals) == 1:
-                        nstmts.append(StmtAss(s.var, s.vals[0][0]))
-                    else:
-                        nstmts.append(s)
-                else:
-                    nstmts.append(s)
-            b.stmts = nstmts
-
-        var_map = {}
-        for b in f.blocks:  # make map of assignments
-            for s in b.stmts:
-                if isinstance(s, StmtAss):
-                    var_map[s.dst] = s.src
-
-        if len(var_map) == 0:  # stop if there are no more assignments
-            break
-
-        for b in f.blocks:  # eliminate assignments
-            get_vals(b)
-            b.stmts = list(filter(lambda s: not isinstance(s, StmtAss), b.stmts))
-
-    while True:
-        var_map = {}
-        for b in f.blocks:  # make map of constant expression values
-            for s in b.stmts:
-                if isinstance(s, llvm.StmtBinOp) and isinstance(s.arg1, int) and isinstance(s.arg2, int):
-                    if s.op == llvm.OP_DIV:
-                        var_map[s.var] = s.arg1 // s.arg2
-                    elif s.op == llvm.OP_REM:
-                        var_map[s.var] = (s.arg1 % s.arg2) - (s.arg2 if s.arg1 < 0 else 0)
-                    else:
-                        var_map[s.var] = int(eval(f'{s.arg1} {BIN_OPS[s.op]} {s.arg2}'))
-
-        if len(var_map) == 0:  # stop if there are no more constant expressions
-            break
-
-        for b in f.blocks:  # eliminate constant expressions
-            get_vals(b)
-            b.stmts = list(filter(lambda s: not (isinstance(s, llvm.StmtBinOp) and s.var in var_map), b.stmts))
-
-
-def optimize_program(p: llvm.Program):
-    for d in p.topdefs:
-        if isinstance(d, llvm.BuiltinFunDecl):
+            if isinstance(s, llvm.StmtPhi):
+                values.replace(s.var, s.vals[0][0])
+        p.stmts[-1:] = [s for s in b.stmts if not isinstance(s, llvm.StmtPhi)]
+        p.succs = b.succs
+        for succ in set(b.succs):
+            succ.preds = [p if pred is b else pred for pred in succ.preds]
+            for phi in succ.stmts:
+                if isinstance(phi, llvm.StmtPhi):
+                    phi.vals = [(v, p.label if lbl == b.label else lbl) for v, lbl in phi.vals]
+        merged.add(b)
+    f.blocks = [b for b in f.blocks if b not in merged]
+    return [b for b in rpo if b not in merged]
+
+
+COMMUTATIVE_OPS = [llvm.OP_ADD, llvm.OP_MUL, llvm.OP_EQ, llvm.OP_NE]
+
+
+def number_values(rpo, values: Values):
+    """
+    dominator based global value numbering: removes pure computations (binary operations, getelementptr, phis,
+    loads) already done in a dominating block, their registers are mapped to the earlier ones in values
+
+    loads are numbered together with the state of the region of memory they read, every store to the region
+    (and call for array elements) creates a new state, so does a merge of different states at the start of a block
+    and a loop header if the region is changed inside the loop
+    """
+    idom = analysis.dominators(rpo)
+    children = analysis.dominator_tree(rpo, idom)
+    region, regions = analysis.memory_regions(rpo)
+    clobbered = dict((header, analysis.stored_regions(body, region)) for header, body in analysis.natural_loops(rpo, idom))
+    fresh_state = count(1)
+    end_states = {}
+    table = {}
+
+    def key(s, b, state):
+        if isinstance(s, llvm.StmtBinOp):
+            arg1, arg2 = s.arg1, s.arg2
+            if s.op in COMMUTATIVE_OPS and llvm.operand_order(arg1) > llvm.operand_order(arg2):
+                arg1, arg2 = arg2, arg1
+            return s.op, s.type, arg1, arg2
+        elif isinstance(s, llvm.StmtGetElementPtr):
+            return 'getelementptr', s.type, s.addr, tuple(s.idx)
+        elif isinstance(s, llvm.StmtPhi):
+            return 'phi', b.label, s.type, tuple(s.vals)
+        elif isinstance(s, llvm.StmtLoad):
+            return 'load', s.type, s.addr, state[region(s.addr)]
+        return None
+
+    stack = [(rpo[0], None)]
+    while stack:
+        b, added = stack.pop()
+        if added is not None:  # leaving block b
+            for k in added:
+                del table[k]
             continue
-        optimize_function(d)
+
+        # predecessors other than these are on back edges (blocks are visited in a topological order of forward edges)
+        preds = [p for p in b.preds if p in end_states]
+        if len(preds) == 0:  # entry block
+            state = dict((r, next(fresh_state)) for r in regions)
+        else:
+            state = dict(end_states[preds[0]])
+            for p in preds[1:]:
+                for r in regions:
+                    if end_states[p][r] != state[r]:
+                        state[r] = next(fresh_state)
+            if len(preds) < len(b.preds):
+                for r in clobbered.get(b, regions):
+                    state[r] = next(fresh_state)
+
+        added = []
+        nstmts = []
+        for s in b.stmts:
+            s.replace_uses(values.__getitem__)
+            k = key(s, b, state)
+            if k is not None:
+                if k in table:
+                    values.replace(s.var, table[k])
+                    continue
+                table[k] = s.var
+                added.append(k)
+            elif isinstance(s, llvm.StmtStore):
+                r = region(s.addr)
+                state[r] = next(fresh_state)
+                k = 'load', s.type, s.addr, state[r]
+                table[k] = s.val  # loading a just stored value
+                added.append(k)
+            elif isinstance(s, llvm.StmtCall):
+                state[analysis.HEAP] = next(fresh_state)
+            nstmts.append(s)
+        b.stmts = nstmts
+        end_states[b] = state
+        stack.append((b, added))
+        stack.extend((c, None) for c in reversed(children[b]))
+
+
+def optimize_function(f: llvm.TopDef):
+    """
+    replaces alloc/store/load statements with register operations, propagates constants,
+    removes code that is never executed, merges chains of blocks, moves loop invariants out of loops
+    and removes redundant computations, dead stores and unused results
+    """
+    with stats.phase('optimize'):
+        with stats.phase('unreachable blocks'):
+            rpo = analysis.remove_unreachable_blocks(f)
+        with stats.phase('mem2reg'):
+            licm.hoist_allocas(f)
+            values = Values()
+            promote_allocas(f, rpo, values)
+            remove_trivial_phis(rpo, values)
+            replace_values(rpo, values)
+        with stats.phase('sccp'):
+            if sccp.propagate_constants(f):
+                rpo = analysis.reverse_postorder(f)
+        with stats.phase('merge blocks'):
+            values = Values()
+            rpo = merge_blocks(f, rpo, values)
+            replace_values(rpo, values)
+        with stats.phase('licm'):
+            if licm.hoist_loop_invariants(f, rpo):
+                rpo = analysis.reverse_postorder(f)
+        with stats.phase('gvn'):
+            values = Values()
+            number_values(rpo, values)
+            remove_trivial_phis(rpo, values)
+            replace_values(rpo, values)
+        with stats.phase('dce'):
+            dce.remove_dead_stores(rpo)
+            dce.remove_dead_code(rpo, analysis.DefUse(rpo))
+
+
+def _optimized(f):
+    if not isinstance(f, llvm.BuiltinFunDecl):
+        optimize_function(f)
+    return f
+
+
+def optimize_functions(functions, jobs=1):
+    """
+    yields optimized functions in the same order, functions are consumed lazily (so they can be
+    translated and written one by one) and optimized in parallel by a pool of jobs processes if jobs > 1
+    """
+    if jobs <= 1:
+        yield from map(_optimized, functions)
+        return
+    import multiprocessing  # only imported if it is used
+    # functions are sent to workers in the compact form of TopDef.__getstate__
+    with multiprocessing.get_context('fork').Pool(jobs) as pool:
+        yield from pool.imap(_optimized, functions, chunksize=4)
+
+
+def optimize_calls(functions, inline_budget=inliner.INLINE_BUDGET):
+    """
+    optimizations of calls done on translated code of the whole program (changed in place) before
+    its functions are optimized separately: removal of tail recursion and inlining (after which tail
+    recursion is removed again, as inlining can turn mutual recursion into self recursion)
+    """
+    for f in functions:
+        if isinstance(f, llvm.TopDef):
+            tailcalls.remove_tail_recursion(f)
+    inliner.inline_functions(functions, inline_budget)
+    for f in functions:
+        if isinstance(f, llvm.TopDef):
+            tailcalls.remove_tail_recursion(f)
+
+
+def optimize_program(p: llvm.Program, jobs=1, inline_budget=inliner.INLINE_BUDGET):
+    optimize_calls(p.topdefs, inline_budget)
+    p.topdefs = list(optimize_functions(p.topdefs, jobs))
@@ -0,0 +1,144 @@
+"""
+sparse conditional constant propagation
+Wegman, Zadeck - Constant Propagation with Conditional Branches
+
+registers start as unknown (not in the values map) and can only go down to a constant and then to OVERDEFINED,
+only blocks reachable through edges found executable so far are evaluated
+"""
+import arithmetic
+import stats
+import backend.llvm as llvm
+import backend.llvm.analysis as analysis
+from backend.llvm.types import TYPE_I64
+
+OVERDEFINED = object()
+
+COMPARISONS = {
+    llvm.OP_EQ: lambda a, b: a == b,
+    llvm.OP_NE: lambda a, b: a != b,
+    llvm.OP_LT: lambda a, b: a < b,
+    llvm.OP_LE: lambda a, b: a <= b,
+    llvm.OP_GT: lambda a, b: a > b,
+    llvm.OP_GE: lambda a, b: a >= b,
+}
+
+ARITHMETIC = {
+    llvm.OP_ADD: lambda a, b: arithmetic.wrap(a + b),
+    llvm.OP_SUB: lambda a, b: arithmetic.wrap(a - b),
+    llvm.OP_MUL: lambda a, b: arithmetic.wrap(a * b),
+    llvm.OP_DIV: arithmetic.div,
+    llvm.OP_REM: arithmetic.rem,
+}
+
+
+def evaluate(op, type, a, b):
+    """returns value of operation on constants or None if it is undefined or can't be computed here"""
+    if op in COMPARISONS:
+        if type != TYPE_I64 and op not in (llvm.OP_EQ, llvm.OP_NE):
+            return None  # i1 is signed in LLVM (true < false)
+        return int(COMPARISONS[op](a, b))
+    return ARITHMETIC[op](a, b)
+
+
+def propagate_constants(f: llvm.TopDef):
+    """
+    replaces registers having constant values with the values, conditional jumps on constants
+    with jumps and removes blocks that are never executed, returns True if the function was changed
+    """
+    label2block = dict((b.label, b) for b in f.blocks)
+    index = analysis.DefUse(f.blocks)
+    # registers defined by phis and binary operations
+    tracked = set(v for v, (_, s) in index.defs.items() if isinstance(s, (llvm.StmtPhi, llvm.StmtBinOp)))
+
+    values = {}
+    executable = set()
+    edges = set()  # executable edges (label of predecessor, label of successor)
+    flow = [(None, f.blocks[0])]
+    ssa = []
+
+    def get(v):
+        if isinstance(v, int):
+            return v
+        return values.get(v) if v in tracked else OVERDEFINED
+
+    def put(var, val):
+        old = values.get(var)
+        if old is OVERDEFINED or (val is not OVERDEFINED and old == val):
+            return
+        values[var] = val
+        ssa.extend(index.users_of(var))
+
+    def visit(b: llvm.Block, s):
+        if isinstance(s, llvm.StmtPhi):
+            val = None
+            for v, lbl in s.vals:
+                if (lbl, b.label) not in edges:
+                    continue
+                v = get(v)
+                if v is OVERDEFINED or (val is not None and v is not None and v != val):
+                    val = OVERDEFINED
+                    break
+                val = v if val is None else val
+            if val is not None:
+                put(s.var, val)
+        elif isinstance(s, llvm.StmtBinOp):
+            a, c = get(s.arg1), get(s.arg2)
+            if a is OVERDEFINED or c is OVERDEFINED:
+                put(s.var, OVERDEFINED)
+            elif a is not None and c is not None:
+                val = evaluate(s.op, s.type, a, c)
+                put(s.var, OVERDEFINED if val is None else val)
+        elif isinstance(s, llvm.StmtCondJump):
+            cond = get(s.cond)
+            if cond is OVERDEFINED or cond == 1:
+                flow.append((b, label2block[s.tlabel]))
+            if cond is OVERDEFINED or cond == 0:
+                flow.append((b, label2block[s.flabel]))
+        elif isinstance(s, llvm.StmtJump):
+            flow.append((b, label2block[s.label]))
+
+    while flow or ssa:
+        while flow:
+            pred, b = flow.pop()
+            if pred is not None:
+                if (pred.label, b.label) in edges:
+                    continue
+                edges.add((pred.label, b.label))
+            if b in executable:
+                for s in b.stmts:
+                    if isinstance(s, llvm.StmtPhi):
+                        visit(b, s)
+                continue
+            executable.add(b)
+            for s in b.stmts:
+                visit(b, s)
+        while ssa:
+            b, s = ssa.pop()
+            if b in executable:
+                visit(b, s)
+                stats.count('sccp steps')
+
+    changed = len(executable) < len(f.blocks)
+    f.blocks = [b for b in f.blocks if b in executable]
+
+    def replacement(v):
+        val = values.get(v) if isinstance(v, llvm.Reg) else None
+        return v if val is None or val is OVERDEFINED else val
+
+    for b in f.blocks:
+        nstmts = []
+        for s in b.stmts:
+            if isinstance(s, (llvm.StmtPhi, llvm.StmtBinOp)) and replacement(s.var) is not s.var:
+                changed = True
+                continue
+            s.replace_uses(replacement)
+            if isinstance(s, llvm.StmtCondJump):
+                targets = [lbl for lbl in (s.tlabel, s.flabel) if (b.label, lbl) in edges]
+                if len(targets) == 1:
+                    s = llvm.StmtJump(targets[0])
+                    changed = True
+            nstmts.append(s)
+        b.stmts = nstmts
+    if changed:
+        analysis.update_edges(f)
+    return changed
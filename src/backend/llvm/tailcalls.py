@@ -0,0 +1,87 @@
+"""
+tail calls
+
+calls in tail position (followed by returning their results) are marked tail, self-recursive ones
+are replaced with stores of the arguments to the parameters and a jump to the start of the function body,
+so the recursion runs as a loop in constant stack space (mem2reg then turns the parameters into phis)
+"""
+import stats
+import backend.llvm as llvm
+import backend.llvm.analysis as analysis
+
+
+def only_returns(stmts, var, pred_label):
+    """
+    returns True if statements (phis followed by a return) entered from block with pred_label
+    only return value of var (None for void returns)
+    """
+    ret = stmts[-1]
+    phis = dict((s.var, s) for s in stmts[:-1] if isinstance(s, llvm.StmtPhi))
+    if len(phis) != len(stmts) - 1:
+        return False
+    elif isinstance(ret, llvm.StmtVoidReturn):
+        return var is None
+    elif not isinstance(ret, llvm.StmtReturn) or var is None:
+        return False
+    elif ret.val in phis:
+        return [v for v, lbl in phis[ret.val].vals if lbl == pred_label] == [var]
+    return ret.val == var
+
+
+def tail_calls(f: llvm.TopDef):
+    """
+    returns list of (block, call, block returning its result) for calls in tail position: calls followed by
+    returning their results in the same block or in the block it jumps to
+    """
+    label2block = dict((b.label, b) for b in f.blocks)
+    calls = []
+    for b in f.blocks:
+        if len(b.stmts) < 2 or not isinstance(b.stmts[-2], llvm.StmtCall):
+            continue
+        call, last = b.stmts[-2:]
+        if isinstance(last, llvm.StmtJump):
+            target = label2block[last.label]
+            if only_returns(target.stmts, call.var, b.label):
+                calls.append((b, call, target))
+        elif only_returns([last], call.var, b.label):
+            calls.append((b, call, b))
+    return calls
+
+
+def remove_tail_recursion(f: llvm.TopDef):
+    """
+    marks calls in tail position and turns self-recursive ones into jumps to a new block following
+    stores of parameters in the entry block, returns True if there were such calls
+    """
+    calls = tail_calls(f)
+    for _, call, _ in calls:
+        call.tail = True
+    if not any(call.fid == f.id for _, call, _ in calls):
+        return False
+
+    entry = f.blocks[0]
+    args = set(v for _, v in f.args)
+    stores = {}  # argument -> its store to the parameter variable
+    start = 0
+    for i, s in enumerate(entry.stmts):
+        if isinstance(s, llvm.StmtStore) and s.val in args:
+            stores[s.val] = s
+            start = i + 1
+    body = analysis.split_block(entry, start, f.new_id())
+    entry.stmts.append(llvm.StmtJump(body.label))
+    entry.succs = [body]
+    body.preds = [entry]
+    f.blocks.insert(1, body)
+
+    for b, call, ret in tail_calls(f):
+        if call.fid != f.id:
+            continue
+        if ret is not b:
+            analysis.remove_pred(ret, b)
+        params = [stores[v] for _, v in f.args]
+        b.stmts[-2:] = [llvm.StmtStore(s.type, v, s.addr, s.noopt) for s, (_, v) in zip(params, call.args)]
+        b.stmts.append(llvm.StmtJump(body.label))
+        b.succs = [body]
+        body.preds.append(b)
+        stats.count('tail recursive calls removed')
+    return True
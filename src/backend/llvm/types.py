@@ -1,10 +1,68 @@
-TYPE_I32 = 'i32'
-TYPE_I64 = 'i64'
-TYPE_I8 = 'i8'
-TYPE_I1 = 'i1'
-TYPE_VOID = 'void'
-
-TYPE_I64A = f'{{{TYPE_I64}, {TYPE_I64}*}}'
-TYPE_I8P = TYPE_I8 + '*'
-TYPE_I8PA = f'{{{TYPE_I64}, {TYPE_I8P}*}}'
-TYPE_I1A = f'{{{TYPE_I64}, {TYPE_I1}*}}'
+from enum import IntEnum
+
+
+class Type(IntEnum):
+    """types of values in statements (string literals have their own types, see StrLit), written as their names"""
+    VOID = 0
+    I1 = 1
+    I8 = 2
+    I32 = 3
+    I64 = 4
+    I1P = 5
+    I8P = 6
+    I64P = 7
+    I8PP = 8
+    I1A = 9
+    I64A = 10
+    I8PA = 11
+
+    def __str__(self):
+        return NAMES[self]
+
+    def __format__(self, spec):
+        return format(NAMES[self], spec)
+
+
+NAMES = {
+    Type.VOID: 'void',
+    Type.I1: 'i1',
+    Type.I8: 'i8',
+    Type.I32: 'i32',
+    Type.I64: 'i64',
+    Type.I1P: 'i1*',
+    Type.I8P: 'i8*',
+    Type.I64P: 'i64*',
+    Type.I8PP: 'i8**',
+    Type.I1A: '{i64, i1*}',
+    Type.I64A: '{i64, i64*}',
+    Type.I8PA: '{i64, i8**}',
+}
+
+POINTERS = {
+    Type.I1: Type.I1P,
+    Type.I8: Type.I8P,
+    Type.I64: Type.I64P,
+    Type.I8P: Type.I8PP,
+}
+
+TYPE_I32 = Type.I32
+TYPE_I64 = Type.I64
+TYPE_I8 = Type.I8
+TYPE_I1 = Type.I1
+TYPE_VOID = Type.VOID
+
+TYPE_I64A = Type.I64A
+TYPE_I8P = Type.I8P
+TYPE_I8PA = Type.I8PA
+TYPE_I1A = Type.I1A
+
+SIZES = {  # sizes of array elements in bytes
+    TYPE_I64: 8,
+    TYPE_I8P: 8,
+    TYPE_I1: 1,
+}
+
+
+def pointer(t):
+    """returns type of pointers to values of type t"""
+    return POINTERS[t]
@@ -0,0 +1,91 @@
+"""
+parallel compilation of many files
+
+usage: compiler.py batch [-j jobs] [--noopts] [--bc] (file.lat | directory)...
+
+writes file.ll (and file.bc linked with lib/runtime.bc if --bc is given) next to each source file
+and prints one json line per file (in the order of arguments) with the result of its compilation
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import compiler
+from cache import open_cache
+
+RUNTIME = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib', 'runtime.bc')
+
+
+def find_sources(paths):
+    """expands directories into sorted lists of .lat files they contain"""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, _, files in os.walk(path):
+                found.extend(os.path.join(root, f) for f in files if f.endswith('.lat'))
+            sources.extend(sorted(found))
+        else:
+            sources.append(path)
+    return sources
+
+
+def link_bitcode(output, cache, key):
+    """assembles output.ll and links it with the runtime library into output.bc"""
+    if cache is not None:
+        data = cache.get(key)
+        if data is not None:
+            with open(f'{output}.bc', 'wb') as f:
+                f.write(data)
+            return
+    subprocess.run(['llvm-as', '-o', f'{output}.tmp.bc', f'{output}.ll'], check=True, capture_output=True)
+    try:
+        subprocess.run(['llvm-link', '-o', f'{output}.bc', f'{output}.tmp.bc', RUNTIME], check=True, capture_output=True)
+    finally:
+        os.unlink(f'{output}.tmp.bc')
+    if cache is not None:
+        with open(f'{output}.bc', 'rb') as f:
+            cache.put(key, f.read())
+
+
+def compile_file(job):
+    path, noopts, bc = job
+    cache = open_cache()
+    try:
+        with open(path) as f:
+            text = f.read()
+        _, inline_budget = compiler.settings()  # files are already compiled in parallel, so LATC_JOBS is not used
+        inline_budget = compiler.default_budget(inline_budget)
+        output = path[:-len('.lat')] if path.endswith('.lat') else path
+        with open(f'{output}.ll', 'w') as f:
+            code, _, err = compiler.compile_source(text, True, noopts, cache, out=f, inline_budget=inline_budget)
+        if code != 0:
+            os.unlink(f'{output}.ll')
+            return {'file': path, 'status': 'ERROR', 'error': err.replace('ERROR\n', '', 1).strip()}
+        if bc:
+            link_bitcode(output, cache, cache and cache.key(text, 'bc', noopts, inline_budget))
+    except subprocess.CalledProcessError as ex:
+        return {'file': path, 'status': 'ERROR', 'error': ex.stderr.decode().strip()}
+    except Exception as ex:
+        return {'file': path, 'status': 'ERROR', 'error': f'{type(ex).__name__}: {ex}'}
+    return {'file': path, 'status': 'OK'}
+
+
+def main(args):
+    argparser = argparse.ArgumentParser(prog=f'{sys.argv[0]} batch')
+    argparser.add_argument('-j', '--jobs', type=int, default=os.cpu_count())
+    argparser.add_argument('--noopts', action='store_true')
+    argparser.add_argument('--bc', action='store_true')
+    argparser.add_argument('paths', nargs='+')
+    args = argparser.parse_args(args)
+
+    jobs = [(path, args.noopts, args.bc) for path in find_sources(args.paths)]
+    ctx = multiprocessing.get_context('fork')
+    failed = False
+    with ctx.Pool(args.jobs) as pool:
+        for result in pool.imap(compile_file, jobs):
+            failed = failed or result['status'] != 'OK'
+            print(json.dumps(result), flush=True)
+    exit(1 if failed else 0)
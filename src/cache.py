@@ -0,0 +1,179 @@
+"""
+content addressed, size bounded cache of compilation results
+
+entries are stored as files named after the hash of the source text, compiler options
+and compiler version, they are written atomically so many processes can share one cache directory;
+their total size is kept in a file updated by every put (entries are listed only to evict some of them,
+which also corrects the total), hits and misses are appended to a log merged by stats()
+"""
+import fcntl
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+
+SOURCES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+SIZE_DIGITS = 20  # the total size is written over the previous one, so it always has the same length
+HIT = b'h'
+MISS = b'm'
+
+_version = None
+
+
+def compiler_version():
+    """returns a hash of the compiler sources, so any change of the compiler invalidates old entries"""
+    global _version
+    if _version is None:
+        h = hashlib.sha256()
+        for root, dirs, files in os.walk(SOURCES_DIR):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(('.py', '.c')):
+                    h.update(name.encode())
+                    with open(os.path.join(root, name), 'rb') as f:
+                        h.update(f.read())
+        _version = h.hexdigest()
+    return _version
+
+
+class Cache:
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self.entries_path = os.path.join(path, 'entries')
+        self.stats_path = os.path.join(path, 'stats.json')
+        self.log_path = os.path.join(path, 'stats.log')
+        self.size_path = os.path.join(path, 'size')
+        os.makedirs(self.entries_path, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """returns cache key for given source text and options"""
+        h = hashlib.sha256(compiler_version().encode())
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode()
+            h.update(len(data).to_bytes(8, 'little'))
+            h.update(data)
+        return h.hexdigest()
+
+    def get(self, key):
+        """returns cached bytes or None"""
+        path = os.path.join(self.entries_path, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            self._count(MISS)
+            return None
+        self._count(HIT)
+        return data
+
+    def put(self, key, data):
+        with self.writer(key) as f:
+            f.write(data)
+
+    @contextmanager
+    def writer(self, key):
+        """returns context manager giving binary file, the entry is stored when it exits without an exception"""
+        import tempfile  # only needed on misses, loading it would slow down every run
+        path = os.path.join(self.entries_path, key)
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=self.entries_path, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                yield f
+                size = f.tell()
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.add_size(size - replaced)
+
+    def add_size(self, delta):
+        """adds delta to the total size of entries, evicts entries if it gets over max_size"""
+        fd = os.open(self.size_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            text = os.pread(fd, SIZE_DIGITS, 0)
+            size = int(text) + delta if text else None  # the total is unknown in a new cache
+            if size is None or size > self.max_size:
+                size = self.evict()
+            os.pwrite(fd, b'%0*d' % (SIZE_DIGITS, size), 0)
+        finally:
+            os.close(fd)
+
+    def entries(self):
+        """returns list of tuples (last use time, size, path) of all entries"""
+        entries = []
+        for e in os.scandir(self.entries_path):
+            if e.name.startswith('.'):
+                continue
+            try:
+                st = e.stat()
+            except FileNotFoundError:  # removed by another process
+                continue
+            entries.append((st.st_mtime, st.st_size, e.path))
+        return entries
+
+    def evict(self):
+        """removes least recently used entries until the cache fits in max_size, returns their total size"""
+        entries = self.entries()
+        size = sum(e[1] for e in entries)
+        if size <= self.max_size:
+            return size
+        for _, esize, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= esize
+            if size <= self.max_size:
+                break
+        return size
+
+    def _count(self, event):
+        """appends a hit or a miss to the log (a single byte, so processes don't have to lock it)"""
+        with open(self.log_path, 'ab') as f:
+            f.write(event)
+
+    def stats(self):
+        """returns dict with hit/miss counters (merging the log into stats.json), number of entries and their total size"""
+        with open(self.stats_path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            text = f.read()
+            stats = json.loads(text) if text else {}
+            merged = f'{self.log_path}.{os.getpid()}'
+            try:
+                os.replace(self.log_path, merged)  # processes appending from now on create a new log
+                with open(merged, 'rb') as log:
+                    events = log.read()
+                os.unlink(merged)
+            except FileNotFoundError:
+                events = b''
+            stats['hits'] = stats.get('hits', 0) + events.count(HIT)
+            stats['misses'] = stats.get('misses', 0) + events.count(MISS)
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(stats))
+        entries = self.entries()
+        return {
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'entries': len(entries),
+            'size': sum(e[1] for e in entries),
+        }
+
+
+def open_cache():
+    """returns cache configured by LATC_CACHE_DIR and LATC_CACHE_SIZE environment variables or None"""
+    path = os.environ.get('LATC_CACHE_DIR')
+    if not path:
+        return None
+    return Cache(path, int(os.environ.get('LATC_CACHE_SIZE', DEFAULT_MAX_SIZE)))
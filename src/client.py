@@ -0,0 +1,103 @@
+"""
+thin client for the compile server (compiler.py serve)
+
+usage: client.py socket [c [noopts]] < source.lat
+
+behaves exactly like compiler.py called with the same arguments and compiler settings
+(LATC_INLINE and LATC_JOBS of this process are sent to the server, its own ones are not used),
+falls back to compiling in this process if the server is not available
+
+the server streams standard output in messages with an 'out' payload, the last message holds
+the exit code and error output
+"""
+import json
+import os
+import socket
+import sys
+
+SETTINGS = ('LATC_INLINE', 'LATC_JOBS')  # environment variables read by compiler.settings()
+CHUNK_SIZE = 64 * 1024
+
+
+def write_message(f, header, *payloads):
+    """writes a json header line followed by raw payloads (their sizes are stored in the header)"""
+    header = dict(header, sizes=[len(p) for p in payloads])
+    f.write(json.dumps(header).encode() + b'\n')
+    for p in payloads:
+        if p:
+            f.write(p)
+    f.flush()
+
+
+def read_message(f):
+    """reads a message written by write_message, returns tuple (header, payloads)"""
+    line = f.readline()
+    if not line:
+        raise EOFError
+    header = json.loads(line)
+    payloads = [f.read(size) for size in header['sizes']]
+    return header, payloads
+
+
+class OutputWriter:
+    """text stream sending written text to f in messages with an 'out' payload of at least CHUNK_SIZE bytes"""
+
+    def __init__(self, f):
+        self.f = f
+        self.parts = []
+        self.size = 0
+
+    def write(self, s):
+        self.parts.append(s)
+        self.size += len(s)
+        if self.size >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            write_message(self.f, {'out': True}, ''.join(self.parts).encode())
+            self.parts = []
+            self.size = 0
+
+
+def request(path, args, source, out):
+    """
+    sends a compilation job to the server, writes standard output to binary file out as it arrives,
+    returns tuple (exit code, error output); raises OSError or EOFError only if the server doesn't answer
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        with sock.makefile('rwb') as f:
+            env = dict((k, os.environ[k]) for k in SETTINGS if k in os.environ)
+            write_message(f, {'args': args, 'env': env}, source)
+            header, (payload,) = read_message(f)
+            try:
+                while 'code' not in header:
+                    out.write(payload)
+                    header, (payload,) = read_message(f)
+            except (OSError, EOFError) as ex:  # output was already written, so it can't be compiled again here
+                return 1, f'connection to the compile server lost: {ex}\n'.encode()
+    return header['code'], payload
+
+
+def main():
+    path = sys.argv[1]
+    args = sys.argv[2:]
+    source = sys.stdin.buffer.read()
+
+    try:
+        code, err = request(path, args, source, sys.stdout.buffer)
+    except (OSError, EOFError):
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import compiler
+        code, _, err = compiler.compile_args(args, source.decode(), sys.stdout)
+        err = err.encode()
+
+    sys.stderr.buffer.write(err)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    exit(code)
+
+
+if __name__ == '__main__':
+    main()
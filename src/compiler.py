@@ -1,32 +1,196 @@
+import io
+import os
 import sys
+import frontend
 import frontend.parser as par
 import errors
-from backend.llvm.translator import translate_program
-from backend.llvm.optimizer import optimize_program
+import stats
+
+# the backend, the cache (with json) and the incremental compilation are imported only when they are used,
+# so checking programs (and compiling with the cache disabled) doesn't pay for loading them
+
+
+def preload():
+    """imports modules imported by the compiler when they are first used (before forking jobs of the compile server)"""
+    import backend.llvm.translator
+    import backend.llvm.optimizer
+    import cache
+    import incremental
+
+
+def write_llvm(program, noopts, jobs, out, inline_budget):
+    """
+    translates, optimizes and writes checked program, functions are optimized and written one at a time
+    (after inlining, which needs translated code of the whole program)
+    """
+    import backend.llvm as llvm
+    from backend.llvm.translator import TranslationContext, translate_functions
+    from backend.llvm.optimizer import optimize_functions, optimize_calls
+    ctx = TranslationContext()
+    functions = stats.counted('translated', stats.timed('translate', translate_functions(program, ctx)))
+    if not noopts:
+        functions = list(functions)
+        with stats.phase('optimize calls'):
+            optimize_calls(functions, inline_budget)
+        functions = optimize_functions(released(functions), jobs)
+    for f in stats.counted('written', functions):
+        with stats.phase('emit'):
+            f.write(out)
+    with stats.phase('emit'):
+        llvm.write_globals(ctx.strlits.values(), out)
+
+
+def released(functions):
+    """yields functions from the list removing them from it, so written ones can be freed"""
+    functions.reverse()
+    while functions:
+        yield functions.pop()
 
-def main():
-    c = (len(sys.argv) > 1 and sys.argv[1] == 'c')
-    text = ''.join(sys.stdin.readlines())
 
+def settings(env=None):
+    """
+    returns number of jobs optimizing functions and the inlining budget (None for the default one) read from
+    LATC_JOBS and LATC_INLINE variables of the environment (os.environ if not given)
+    """
+    env = os.environ if env is None else env
+    inline_budget = int(env['LATC_INLINE']) if 'LATC_INLINE' in env else None
+    return int(env.get('LATC_JOBS', 1)), inline_budget
+
+
+def default_budget(inline_budget):
+    """returns the inlining budget, the default one if it is None"""
+    if inline_budget is None:
+        from backend.llvm.inliner import INLINE_BUDGET
+        return INLINE_BUDGET
+    return inline_budget
+
+
+def run_compiler(text, c, noopts, cache=None, jobs=1, out=None, inline_budget=None):
+    """if out is given, standard output is written to it instead of being returned"""
+    if c:
+        inline_budget = default_budget(inline_budget)
     try:
         program = par.parse(text)
-        program.check()
+        if stats.enabled():
+            stats.count('ast nodes', stats.ast_nodes(program))
+        if c and cache is not None:
+            from incremental import compile_program
+            module = compile_program(program, noopts, cache, jobs, inline_budget)
+        else:
+            with stats.phase('check'):
+                program.check()
+            stats.count('functions', sum(1 for d in program.topdefs if isinstance(d, frontend.TopDef)))
     except errors.CompilerError as err:
-        print(f'ERROR\n{err}\n', file=sys.stderr)
-        exit(1)
-        return
+        return 1, '', f'ERROR\n{err}\n\n'
+
+    buffer = io.StringIO() if out is None else out
+    if not c:
+        buffer.write(f'{program}\n')
+    elif cache is not None:
+        module.write(buffer)
+    else:
+        write_llvm(program, noopts, jobs, buffer, inline_budget)
+    return 0, buffer.getvalue() if out is None else '', '' if c else 'OK\n\n'
+
 
+def compile_source(text, c=False, noopts=False, cache=None, jobs=1, out=None, inline_budget=None):
+    """
+    checks (and compiles to LLVM if c is set) given program text, functions are optimized by jobs processes
+    after inlining calls of functions having at most inline_budget statements (None for the default budget)
+    returns tuple (exit code, standard output, error output), standard output is written to out if it is given
+    (the code is written function by function, so memory used for it is bounded, with the cache it is written
+    to the cache entry at the same time)
+    """
     if c:
-        noopts = (len(sys.argv) > 2 and sys.argv[2] == 'noopts')
-        llvm = translate_program(program)
-        if not noopts:
-            optimize_program(llvm)
-        print(llvm)
+        inline_budget = default_budget(inline_budget)
+    if cache is None:
+        return run_compiler(text, c, noopts, jobs=jobs, out=out, inline_budget=inline_budget)
+    buffer = io.StringIO() if out is None else out
+    key = cache.key(text, c, noopts, inline_budget)
+    data = cache.get(key)
+    if data is not None:
+        code, err = read_entry(data, buffer)
     else:
-        print(f'OK\n', file=sys.stderr)
-        print(program)
+        with cache.writer(key) as f:
+            code, _, err = run_compiler(text, c, noopts, cache, jobs, Tee(buffer, f), inline_budget)
+            f.write(f'{err}\n{code} {len(err.encode())}'.encode())
+    return code, buffer.getvalue() if out is None else '', err
 
-    exit(0)
+
+class Tee:
+    """text stream writing to out and (encoded) to binary file f"""
+
+    def __init__(self, out, f):
+        self.out = out
+        self.f = f
+
+    def write(self, s):
+        self.out.write(s)
+        self.f.write(s.encode())
+
+
+def read_entry(data, out):
+    """
+    writes standard output stored in a cache entry to out, returns exit code and error output,
+    entries hold standard output, error output and a line with the exit code and the size of error output
+    """
+    end = data.rindex(b'\n')
+    code, size = map(int, data[end + 1:].split())
+    out.write(data[:end - size].decode())
+    return code, data[end - size:end].decode()
+
+
+def compile_args(args, text, out=None, env=None):
+    """
+    compiles program text using command line arguments [c [noopts]] [--stats[=text|json]]
+    number of processes optimizing functions is read from LATC_JOBS variable of env (default 1, os.environ
+    if env is not given) and the inlining budget from LATC_INLINE (0 disables inlining)
+
+    with --stats the program is compiled without cache in a single process and statistics of compilation
+    phases are appended to the error output
+    """
+    args, stats_format = stats.parse_option(args)
+    c = (len(args) > 0 and args[0] == 'c')
+    noopts = (len(args) > 1 and args[1] == 'noopts')
+    jobs, inline_budget = settings(env)
+    if stats_format is None:
+        cache = None
+        if os.environ.get('LATC_CACHE_DIR'):
+            from cache import open_cache
+            cache = open_cache()
+        return compile_source(text, c, noopts, cache, jobs, out, inline_budget)
+    with stats.collect() as collected:
+        code, output, err = compile_source(text, c, noopts, None, 1, out, inline_budget)
+    return code, output, err + collected.report(stats_format)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        import server
+        server.main(sys.argv[2:])
+        return
+    elif len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        import batch
+        batch.main(sys.argv[2:])
+        return
+    elif len(sys.argv) > 1 and sys.argv[1] == 'native':
+        import native
+        native.main(sys.argv[2:])
+        return
+    elif len(sys.argv) > 1 and sys.argv[1] == 'cache':
+        from cache import open_cache
+        cache = open_cache()
+        if cache is None:
+            print('cache is disabled (LATC_CACHE_DIR is not set)', file=sys.stderr)
+            exit(1)
+        import json
+        print(json.dumps(cache.stats()))
+        return
+
+    text = ''.join(sys.stdin.readlines())
+    code, _, err = compile_args(sys.argv[1:], text, sys.stdout)
+    sys.stderr.write(err)
+    exit(code)
 
 
 if __name__ == '__main__':
@@ -1,20 +1,65 @@
+import operator
 import errors
+import arithmetic
 from frontend.types import TYPE_VOID, TYPE_INT, TYPE_BOOL, TYPE_STRING, Type
-from dataclasses import dataclass
+from frontend.env import Env
+from slots import slotted
+from collections import deque
 
 COMP_OPS = ['<', '<=', '>', '>=', '==', '!=']
-
-
-@dataclass
+INT_OPS = {
+    '+': lambda a, b: arithmetic.wrap(a + b),
+    '-': lambda a, b: arithmetic.wrap(a - b),
+    '*': lambda a, b: arithmetic.wrap(a * b),
+    '/': arithmetic.div,
+    '%': arithmetic.rem,
+}
+COMP_FUNCS = dict(zip(COMP_OPS, [operator.lt, operator.le, operator.gt, operator.ge, operator.eq, operator.ne]))
+NO_CALLS = frozenset()  # cached by all nodes not calling functions
+
+_cached_attrs = []
+
+
+def cached(func):
+    """property computed on first access and stored on the node (see Node.invalidate)"""
+    attr = f'_{func.__name__}'
+    if attr not in _cached_attrs:
+        _cached_attrs.append(attr)
+
+    def getter(self):
+        val = getattr(self, attr, None)
+        if val is None:
+            val = func(self)
+            setattr(self, attr, val)
+        return val
+    getter.cached_attr = attr
+    return property(getter, doc=func.__doc__)
+
+
+def node(cls):
+    """
+    decorator of syntax tree nodes: dataclasses with __slots__ (trees of large programs have millions of nodes),
+    including attributes of their cached properties
+    """
+    return slotted(cls, [p.fget.cached_attr for p in cls.__dict__.values() if hasattr(getattr(p, 'fget', None), 'cached_attr')])
+
+
+@node
 class Node:
     lineno: int
 
+    def invalidate(self):
+        """forgets cached properties, has to be called after the node's subtree is modified"""
+        for attr in _cached_attrs:
+            if hasattr(type(self), attr):
+                setattr(self, attr, None)
+
 
 # -------- expressions --------
 
-@dataclass
+@node
 class Exp(Node):
-    type = None
+    __slots__ = ('type',)  # set by check
 
     @property
     def called_functions(self):
@@ -29,7 +74,7 @@ class Exp(Node):
         return self
 
 
-@dataclass
+@node
 class ExpUnOp(Exp):
     op: str
     exp: Exp
@@ -56,13 +101,13 @@ class ExpUnOp(Exp):
         return self
 
 
-@dataclass
+@node
 class ExpBinOp(Exp):
     op: str
     exp1: Exp
     exp2: Exp
 
-    @property
+    @cached
     def called_functions(self):
         fs = set()
         fs.update(self.exp1.called_functions)
@@ -72,7 +117,7 @@ class ExpBinOp(Exp):
                 fs.add('$addStrings')
             elif self.op in COMP_OPS:
                 fs.add('$compareStrings')
-        return fs
+        return fs or NO_CALLS
 
     def __str__(self):
         return f'({self.exp1} {self.op} {self.exp2})'
@@ -85,12 +130,9 @@ class ExpBinOp(Exp):
             raise errors.TypeMismatchError(self.lineno)
         if self.op in ['+', '-', '*', '/', '%'] and exp_types == (TYPE_INT, TYPE_INT):
             if isinstance(self.exp1, ExpConst) and isinstance(self.exp2, ExpConst):
-                if self.op == '/':
-                    return ExpIntConst(self.lineno, self.exp1.val // self.exp2.val)
-                elif self.op == '%':
-                    return ExpIntConst(self.lineno, (self.exp1.val % self.exp2.val) - (self.exp2.val if self.exp1.val < 0 else 0))
-                else:
-                    return ExpIntConst(self.lineno, eval(f'{self.exp1.val}{self.op}{self.exp2.val}'))
+                val = INT_OPS[self.op](self.exp1.val, self.exp2.val)
+                if val is not None:  # division by zero is left for run time
+                    return ExpIntConst(self.lineno, val)
             self.type = TYPE_INT
         elif self.op == '+' and exp_types == (TYPE_STRING, TYPE_STRING):
             if isinstance(self.exp1, ExpConst) and isinstance(self.exp2, ExpConst):
@@ -107,15 +149,16 @@ class ExpBinOp(Exp):
                     return ExpBoolConst(self.lineno, self.exp1.val or self.exp2.val)
                 elif self.op == '&&':
                     return ExpBoolConst(self.lineno, self.exp1.val and self.exp2.val)
-                else:
-                    return ExpBoolConst(self.lineno, eval(f'{self.exp1.val}{self.op}{self.exp2.val}'))
+                elif self.exp1.type != TYPE_STRING or self.op in ['==', '!=']:
+                    # literals hold escape sequences, so only equality of strings can be decided here
+                    return ExpBoolConst(self.lineno, COMP_FUNCS[self.op](self.exp1.val, self.exp2.val))
             self.type = TYPE_BOOL
         else:
             raise errors.TypeMismatchError(self.lineno)
         return self
 
 
-@dataclass
+@node
 class ExpVar(Exp):
     id: str
 
@@ -130,7 +173,7 @@ class ExpVar(Exp):
         return self
 
 
-@dataclass
+@node
 class ExpConst(Exp):
     val: object
 
@@ -138,12 +181,12 @@ class ExpConst(Exp):
         return str(self.val)
 
 
-@dataclass
+@node
 class ExpIntConst(ExpConst):
     type = TYPE_INT
 
 
-@dataclass
+@node
 class ExpStringConst(ExpConst):
     type = TYPE_STRING
 
@@ -151,17 +194,17 @@ class ExpStringConst(ExpConst):
         return f'"{self.val}"'
 
 
-@dataclass
+@node
 class ExpBoolConst(ExpConst):
     type = TYPE_BOOL
 
 
-@dataclass
+@node
 class ExpFun(Exp):
     fid: str
     args: list
 
-    @property
+    @cached
     def called_functions(self):
         fs = set()
         for arg in self.args:
@@ -190,7 +233,7 @@ class ExpFun(Exp):
         return self
 
 
-@dataclass
+@node
 class ExpArray(Exp):
     id: str
     idx: Exp
@@ -211,8 +254,9 @@ class ExpArray(Exp):
         return self
 
 
-@dataclass
+@node
 class ExpAttr(Exp):
+    __slots__ = ('array_type',)
     id: str
     attr: str
 
@@ -232,7 +276,7 @@ class ExpAttr(Exp):
         return self
 
 
-@dataclass
+@node
 class ExpNewArray(Exp):
     elem_type: Type
     len: Exp
@@ -242,7 +286,7 @@ class ExpNewArray(Exp):
 
     @property
     def called_functions(self):
-        return self.len.called_functions
+        return self.len.called_functions | {'$newArray'}
 
     def check(self, fenv, venv):
         self.len = self.len.check(fenv, venv)
@@ -263,9 +307,9 @@ def as_block(s):
         assert False
 
 
-@dataclass
+@node
 class Lhs(Node):
-    type = None
+    __slots__ = ('type',)
 
     def check(self, fenv, venv):
         """checks corectness of LHS"""
@@ -277,7 +321,7 @@ class Lhs(Node):
         return set()
 
 
-@dataclass
+@node
 class LhsVar(Lhs):
     id: str
 
@@ -292,7 +336,7 @@ class LhsVar(Lhs):
         return self
 
 
-@dataclass
+@node
 class LhsArray(Lhs):
     id: str
     idx: Exp
@@ -313,7 +357,7 @@ class LhsArray(Lhs):
         return self
 
 
-@dataclass
+@node
 class Stmt(Node):
     @property
     def called_functions(self):
@@ -333,13 +377,13 @@ class Stmt(Node):
         return self, venv
 
 
-@dataclass
+@node
 class StmtSkip(Stmt):
     def __str__(self):
         return ';'
 
 
-@dataclass
+@node
 class StmtDecl(Stmt):
     type: Type
     id: str
@@ -350,12 +394,16 @@ class StmtDecl(Stmt):
     def check(self, fenv, venv):
         if self.type == TYPE_VOID:
             raise errors.InvalidTypeError(self.lineno, self.type)
-        nvenv = venv.copy()
-        nvenv[self.id] = self.type
-        return self, nvenv
+        self.declare(venv)
+        return self, venv
 
+    def declare(self, venv):
+        if venv.declared_in_scope(self.id):
+            raise errors.DuplicateVariableNameError(self.lineno, self.id)
+        venv.declare(self.id, self.type)
 
-@dataclass
+
+@node
 class StmtDeclInit(StmtDecl):
     exp: Exp
 
@@ -370,12 +418,11 @@ class StmtDeclInit(StmtDecl):
         self.exp = self.exp.check(fenv, venv)
         if self.type != self.exp.type:
             raise errors.TypeMismatchError(self.lineno)
-        nvenv = venv.copy()
-        nvenv[self.id] = self.type
-        return self, nvenv
+        self.declare(venv)
+        return self, venv
 
 
-@dataclass
+@node
 class StmtAss(Stmt):
     lhs: Lhs
     exp: Exp
@@ -395,21 +442,19 @@ class StmtAss(Stmt):
         return self, venv
 
 
-@dataclass
+@node
 class StmtAssVar(StmtAss):
     pass
 
 
-@dataclass
+@node
 class StmtAssArray(StmtAss):
-    @property
+    @cached
     def called_functions(self):
-        fs = super().called_functions
-        fs.update(self.lhs.called_functions)
-        return fs
+        return self.exp.called_functions | self.lhs.called_functions or NO_CALLS
 
 
-@dataclass
+@node
 class StmtReturn(Stmt):
     exp: Exp
 
@@ -431,7 +476,7 @@ class StmtReturn(Stmt):
         return self, venv
 
 
-@dataclass
+@node
 class StmtVoidReturn(Stmt):
     @property
     def returns(self):
@@ -446,17 +491,14 @@ class StmtVoidReturn(Stmt):
         return self, venv
 
 
-@dataclass
+@node
 class StmtIf(Stmt):
     cond: Exp
     stmt: Stmt
 
-    @property
+    @cached
     def called_functions(self):
-        fs = set()
-        fs.update(self.cond.called_functions)
-        fs.update(self.stmt.called_functions)
-        return fs
+        return self.cond.called_functions | self.stmt.called_functions or NO_CALLS
 
     def __post_init__(self):
         self.stmt = as_block(self.stmt)
@@ -477,22 +519,20 @@ class StmtIf(Stmt):
         return self, venv
 
 
-@dataclass
+@node
 class StmtIfElse(StmtIf):
     stmt2: Stmt
 
-    @property
+    @cached
     def called_functions(self):
-        fs = super().called_functions
-        fs.update(self.stmt2.called_functions)
-        return fs
+        return self.cond.called_functions | self.stmt.called_functions | self.stmt2.called_functions or NO_CALLS
 
-    @property
+    @cached
     def returns(self):
         return self.stmt.returns and self.stmt2.returns
 
     def __post_init__(self):
-        super().__post_init__()
+        super(StmtIfElse, self).__post_init__()
         self.stmt2 = as_block(self.stmt2)
 
     def __str__(self):
@@ -509,7 +549,7 @@ class StmtIfElse(StmtIf):
         return self, venv
 
 
-@dataclass
+@node
 class StmtWhile(StmtIf):
     def __str__(self):
         return f'while {self.cond} {self.stmt}'
@@ -524,7 +564,7 @@ class StmtWhile(StmtIf):
         return self, venv
 
 
-@dataclass
+@node
 class StmtWhileTrue(Stmt):
     stmt: Stmt
 
@@ -547,7 +587,7 @@ class StmtWhileTrue(Stmt):
         return self, venv
 
 
-@dataclass
+@node
 class StmtExp(Stmt):
     exp: Exp
 
@@ -563,18 +603,18 @@ class StmtExp(Stmt):
         return self, venv
 
 
-@dataclass
+@node
 class StmtBlock(Stmt):
     stmts: list
 
-    @property
+    @cached
     def called_functions(self):
         fs = set()
         for s in self.stmts:
             fs.update(s.called_functions)
-        return fs
+        return fs or NO_CALLS
 
-    @property
+    @cached
     def returns(self):
         return any(s.returns for s in self.stmts)
 
@@ -584,25 +624,20 @@ class StmtBlock(Stmt):
                + '\n}'
 
     def check(self, fenv, venv):
-        localids = []
-        nvenv = venv.copy()
         nstmts = []
-        for stmt in self.stmts:
-            nstmt, nvenv = stmt.check(fenv, nvenv)
-            if isinstance(nstmt, StmtDecl):
-                if nstmt.id in localids:
-                    raise errors.DuplicateVariableNameError(nstmt.lineno, nstmt.id)
-                localids.append(nstmt.id)
-            nstmts.append(nstmt)
-            if nstmt.returns:
-                break
+        with venv.scope():
+            for stmt in self.stmts:
+                nstmt, _ = stmt.check(fenv, venv)
+                nstmts.append(nstmt)
+                if nstmt.returns:
+                    break
         self.stmts = nstmts
         return self, venv
 
 
 # -------- function definitions --------
 
-@dataclass
+@node
 class FunArg(Node):
     type: Type
     id: str
@@ -610,7 +645,7 @@ class FunArg(Node):
     def __str__(self):
         return f'{self.type} {self.id}'
 
-@dataclass
+@node
 class FunDecl(Node):
     type: Type
     id: str
@@ -631,7 +666,7 @@ class FunDecl(Node):
         pass
 
 
-@dataclass
+@node
 class TopDef(FunDecl):
     block: StmtBlock
 
@@ -649,21 +684,22 @@ class TopDef(FunDecl):
     def check(self, fenv):
         if self.id == 'main' and (self.type != TYPE_INT or len(self.args) > 0):
             raise errors.InvalidMainFunctionError(self.lineno)
-        venv = {}
+        venv = Env()
         for arg in self.args:
             if arg.id in venv:
                 raise errors.DuplicateVariableNameError(arg.lineno, arg.id)
             elif arg.type == TYPE_VOID:
                 raise errors.InvalidTypeError(arg.lineno, arg.type)
-            venv[arg.id] = arg.type
-        venv['*'] = self.type
+            venv.declare(arg.id, arg.type)
+        venv.declare('*', self.type)
         self.block, _ = self.block.check(fenv, venv)
         if not self.block.returns:
             if self.type != TYPE_VOID:
                 raise errors.MissingReturnError(self.lineno)
             self.block.stmts.append(StmtVoidReturn(self.block.lineno))
+            self.block.invalidate()
 
-@dataclass
+@node
 class BuiltinFunDecl(FunDecl):
     def __post_init__(self):
         # this will simplify type checking
@@ -679,7 +715,7 @@ class BuiltinFunDecl(FunDecl):
 
 # -------- program --------
 
-@dataclass
+@node
 class Program(Node):
     topdefs: list
 
@@ -693,6 +729,7 @@ class Program(Node):
             # internal functions:
             BuiltinFunDecl(0, TYPE_BOOL, '$compareStrings', [TYPE_INT, TYPE_STRING, TYPE_STRING]),
             BuiltinFunDecl(0, TYPE_STRING, '$addStrings', [TYPE_STRING, TYPE_STRING]),
+            BuiltinFunDecl(0, TYPE_STRING, '$newArray', [TYPE_INT, TYPE_INT]),  # returns i8* to zeroed memory
         ] + self.topdefs
 
     def __str__(self):
@@ -703,6 +740,13 @@ class Program(Node):
         - checks corectness of the program
         - removes unused functions
         """
+        fenv = self.function_env()
+        for topdef in self.topdefs:
+            topdef.check(fenv)
+        self.remove_unused_functions(lambda fid: fenv[fid].called_functions)
+
+    def function_env(self):
+        """returns map of function ids to their declarations, checks function names"""
         fenv = {}
         for topdef in self.topdefs:
             if topdef.id in fenv:
@@ -710,20 +754,21 @@ class Program(Node):
             fenv[topdef.id] = topdef
         if 'main' not in fenv:
             raise errors.MissingMainFunctionError(self.lineno)
-        for topdef in self.topdefs:
-            topdef.check(fenv)
+        return fenv
 
-        queue = ['main']
-        called_functions = []
+    def remove_unused_functions(self, called_functions):
+        """removes functions not reachable from main (called_functions(fid) returns ids of functions called by fid)"""
+        queue = deque(['main'])
+        used = {'main'}
         while len(queue) > 0:
-            fid = queue.pop(0)
-            called_functions.append(fid)
-            for fid2 in fenv[fid].called_functions:
-                if fid2 not in called_functions:
+            fid = queue.popleft()
+            for fid2 in called_functions(fid):
+                if fid2 not in used:
+                    used.add(fid2)
                     queue.append(fid2)
 
         ntopdefs = []
         for topdef in self.topdefs:
-            if topdef.id in called_functions:
+            if topdef.id in used:
                 ntopdefs.append(topdef)
         self.topdefs = ntopdefs
@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+
+_MISSING = object()
+
+
+class Env:
+    """
+    environment (variable name -> value) with nested scopes
+    - declarations and lookups are O(1), nothing is copied when entering a scope
+    - leaving a scope restores declarations shadowed inside it
+    """
+
+    def __init__(self, items=()):
+        self.vars = dict(items)
+        self.scopes = []  # for every open scope: name -> value it shadows
+
+    def __getitem__(self, name):
+        return self.vars[name]
+
+    def __contains__(self, name):
+        return name in self.vars
+
+    def declared_in_scope(self, name):
+        """returns true if name was declared in the innermost scope"""
+        return len(self.scopes) > 0 and name in self.scopes[-1]
+
+    def declare(self, name, value):
+        if self.scopes and name not in self.scopes[-1]:
+            self.scopes[-1][name] = self.vars.get(name, _MISSING)
+        self.vars[name] = value
+
+    @contextmanager
+    def scope(self):
+        self.scopes.append({})
+        try:
+            yield self
+        finally:
+            for name, value in self.scopes.pop().items():
+                if value is _MISSING:
+                    del self.vars[name]
+                else:
+                    self.vars[name] = value
@@ -1,4 +1,4 @@
-import ply.lex as lex
+import sys
 import errors
 
 reserved = ("true", "false", "return", "if", "else", "while", "for", "new")
@@ -67,6 +67,7 @@ t_colon = r'\:'
 def t_id(t):
     r"""[a-zA-Z_]\w*"""
     t.type = t.value if t.value in reserved else 'id'
+    t.value = sys.intern(t.value)  # shared by all nodes using the identifier
     return t
 
 t_intconst = r'\d+'
@@ -78,5 +79,3 @@ def t_comment(t):
 
 def t_error(t):
     raise errors.IllegalCharacterError(t.lexer.lineno, t.value[0])
-
-lexer = lex.lex(debug=False)
@@ -0,0 +1,11 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('and', 'colon', 'comma', 'divide', 'dot', 'else', 'eq', 'equals', 'false', 'for', 'ge', 'gt', 'id', 'if', 'intconst', 'lbrace', 'lbracket', 'le', 'lparen', 'lt', 'minus', 'minusminus', 'mod', 'ne', 'new', 'not', 'or', 'plus', 'plusplus', 'rbrace', 'rbracket', 'return', 'rparen', 'semi', 'stringconst', 'times', 'true', 'while'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_newline>\\n+)|(?P<t_id>[a-zA-Z_]\\w*)|(?P<t_comment>/\\*(.|\\n)*?\\*/|(\\#|//).*)|(?P<t_stringconst>\\"([^\\\\\\n]|(\\\\.))*?\\")|(?P<t_and>\\&\\&)|(?P<t_eq>\\=\\=)|(?P<t_ge>\\>\\=)|(?P<t_le>\\<\\=)|(?P<t_minusminus>\\-\\-)|(?P<t_ne>\\!\\=)|(?P<t_or>\\|\\|)|(?P<t_plusplus>\\+\\+)|(?P<t_intconst>\\d+)|(?P<t_colon>\\:)|(?P<t_comma>\\,)|(?P<t_divide>\\/)|(?P<t_dot>\\.)|(?P<t_equals>\\=)|(?P<t_gt>\\>)|(?P<t_lbrace>\\{)|(?P<t_lbracket>\\[)|(?P<t_lparen>\\()|(?P<t_lt>\\<)|(?P<t_minus>\\-)|(?P<t_mod>\\%)|(?P<t_not>\\!)|(?P<t_plus>\\+)|(?P<t_rbrace>\\})|(?P<t_rbracket>\\])|(?P<t_rparen>\\))|(?P<t_semi>\\;)|(?P<t_times>\\*)', [None, ('t_newline', 'newline'), ('t_id', 'id'), ('t_comment', 'comment'), None, None, (None, 'stringconst'), None, None, (None, 'and'), (None, 'eq'), (None, 'ge'), (None, 'le'), (None, 'minusminus'), (None, 'ne'), (None, 'or'), (None, 'plusplus'), (None, 'intconst'), (None, 'colon'), (None, 'comma'), (None, 'divide'), (None, 'dot'), (None, 'equals'), (None, 'gt'), (None, 'lbrace'), (None, 'lbracket'), (None, 'lparen'), (None, 'lt'), (None, 'minus'), (None, 'mod'), (None, 'not'), (None, 'plus'), (None, 'rbrace'), (None, 'rbracket'), (None, 'rparen'), (None, 'semi'), (None, 'times')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
+stamp = '4310973c84249fbe010fffda839b9a4afd08b3bdd81f364c0cad6c3f3237f799'
@@ -1,244 +1,355 @@
-import ply.yacc as yacc
+"""
+hand-written parser: recursive descent for statements and operator precedence for expressions
+
+it builds the same trees as the PLY parser (frontend/plyparser.py, used with LATC_PARSER=ply) and fails
+with the same errors: nodes get the line number of the token following them (the lookahead the LALR
+parser had when reducing them) and types are checked at the same tokens; lists of statements, arguments
+and expressions are built in loops, so parsing takes linear time
+"""
+import os
 import frontend
 import errors
-from frontend.lexer import tokens, precedence, lexer
-
-
-def p_program(p):
-    """program : topdefs"""
-    p[0] = frontend.Program(p.lexer.lineno, p[1])
-
-def p_topdefs(p):
-    """topdefs : topdef topdefs"""
-    p[0] = [p[1]] + p[2]
-
-def p_topdefs_empty(p):
-    """topdefs : """
-    p[0] = []
-
-def p_topdef(p):
-    """topdef : type id lparen args rparen block"""
-    p[0] = frontend.TopDef(p.lexer.lineno, p[1], p[2], p[4], p[6])
-
-def p_args(p):
-    """args : arg comma args"""
-    p[0] = [p[1]] + p[3]
-
-def p_args_one(p):
-    """args : arg"""
-    p[0] = [p[1]]
-
-def p_args_empty(p):
-    """args : """
-    p[0] = []
-
-def p_arg(p):
-    """arg : type id"""
-    p[0] = frontend.FunArg(p.lexer.lineno, p[1], p[2])
-
-
-def p_stmts(p):
-    """stmts : stmt stmts"""
-    if isinstance(p[1], list):
-        p[0] = p[1] + p[2]
-    else:
-        p[0] = [p[1]] + p[2]
-
-def p_stmts_empty(p):
-    """stmts : """
-    p[0] = []
-
-def p_block(p):
-    """block : lbrace stmts rbrace"""
-    p[0] = frontend.StmtBlock(p.lexer.lineno, p[2])
-
-def p_stmt_empty(p):
-    """stmt : semi"""
-    p[0] = frontend.StmtSkip(p.lexer.lineno)
-
-def p_stmt_block(p):
-    """stmt : block"""
-    p[0] = p[1]
-
-def p_stmt_decl(p):
-    """stmt : type decls semi"""
-    stmts = []
-    for decl in p[2]:
-        if len(decl) == 2:
-            stmts.append(frontend.StmtDeclInit(p.lexer.lineno, p[1], decl[0], decl[1]))
-        else:
-            stmts.append(frontend.StmtDecl(p.lexer.lineno, p[1], decl[0]))
-    p[0] = stmts
-
-def p_decls(p):
-    """decls : decl comma decls """
-    p[0] = [p[1]] + p[3]
-
-def p_decls_one(p):
-    """decls : decl"""
-    p[0] = [p[1]]
-
-def p_decl(p):
-    """decl : id"""
-    p[0] = (p[1],)
-
-def p_decl_init(p):
-    """decl : id equals exp"""
-    p[0] = (p[1], p[3])
-
-def p_stmt_ass(p):
-    """stmt : id equals exp semi"""
-    p[0] = frontend.StmtAssVar(p.lexer.lineno, frontend.LhsVar(p.lexer.lineno, p[1]), p[3])
-
-def p_stmt_ass_array(p):
-    """stmt : id lbracket exp rbracket equals exp semi"""
-    p[0] = frontend.StmtAssArray(p.lexer.lineno, frontend.LhsArray(p.lexer.lineno, p[1], p[3]), p[6])
-
-def p_stmt_inc(p):
-    """stmt : id plusplus semi"""
-    p[0] = frontend.StmtAssVar(p.lexer.lineno, frontend.LhsVar(p.lexer.lineno, p[1]), frontend.ExpBinOp(p.lexer.lineno, '+', frontend.ExpVar(p.lexer.lineno, p[1]), frontend.ExpIntConst(p.lexer.lineno, 1)))
-
-def p_stmt_dec(p):
-    """stmt : id minusminus semi"""
-    p[0] = frontend.StmtAssVar(p.lexer.lineno, frontend.LhsVar(p.lexer.lineno, p[1]), frontend.ExpBinOp(p.lexer.lineno, '-', frontend.ExpVar(p.lexer.lineno, p[1]), frontend.ExpIntConst(p.lexer.lineno, 1)))
-
-def p_stmt_return(p):
-    """stmt : return exp semi"""
-    p[0] = frontend.StmtReturn(p.lexer.lineno, p[2])
-
-def p_stmt_void_return(p):
-    """stmt : return semi"""
-    p[0] = frontend.StmtVoidReturn(p.lexer.lineno)
-
-def p_stmt_if(p):
-    """stmt : if lparen exp rparen stmt"""
-    p[0] = frontend.StmtIf(p.lexer.lineno, p[3], p[5])
-
-def p_stmt_if_else(p):
-    """stmt : if lparen exp rparen stmt else stmt"""
-    p[0] = frontend.StmtIfElse(p.lexer.lineno, p[3], p[5], p[7])
-
-def p_stmt_while(p):
-    """stmt : while lparen exp rparen stmt"""
-    p[0] = frontend.StmtWhile(p.lexer.lineno, p[3], p[5])
-
-def p_stmt_foreach(p):
-    """stmt : for lparen simple_type id colon id rparen stmt"""
-    ln = p.lexer.lineno
-    p[0] = frontend.StmtBlock(ln, [
-        frontend.StmtDecl(ln, frontend.types.TYPE_INT, '$idx'),
+import stats
+from frontend import scanner
+from frontend.types import TYPE_INT
+
+BINARY_OPS = {
+    '||': 1,
+    '&&': 2,
+    '<': 3, '<=': 3, '>': 3, '>=': 3, '==': 3, '!=': 3,
+    '+': 4, '-': 4,
+    '*': 5, '/': 5, '%': 5,
+}
+RIGHT_ASSOC = 2  # operators of this or lower precedence are right associative
+ID_EXP_SUFFIXES = frozenset(('(', '[', '.'))  # tokens following identifiers in calls, array elements and attributes
+
+
+def increment(ln, name, op):
+    """returns statement name++ (op '+') or name-- (op '-')"""
+    return frontend.StmtAssVar(ln, frontend.LhsVar(ln, name),
+                               frontend.ExpBinOp(ln, op, frontend.ExpVar(ln, name), frontend.ExpIntConst(ln, 1)))
+
+
+def foreach(ln, type, var, array, stmt):
+    """returns for (type var : array) stmt as a while loop over the array"""
+    return frontend.StmtBlock(ln, [
+        frontend.StmtDecl(ln, TYPE_INT, '$idx'),
         frontend.StmtWhile(ln,
-            frontend.ExpBinOp(ln, '<', frontend.ExpVar(ln, '$idx'), frontend.ExpAttr(ln, p[6], 'length')),
+            frontend.ExpBinOp(ln, '<', frontend.ExpVar(ln, '$idx'), frontend.ExpAttr(ln, array, 'length')),
             frontend.StmtBlock(ln, [
-                frontend.StmtDeclInit(ln, p[3], p[4], frontend.ExpArray(ln, p[6], frontend.ExpVar(ln, '$idx'))),
-                p[8],
-                frontend.StmtAssVar(ln, frontend.LhsVar(ln, '$idx'), frontend.ExpBinOp(ln, '+', frontend.ExpVar(ln, '$idx'), frontend.ExpIntConst(ln, 1)))
+                frontend.StmtDeclInit(ln, type, var, frontend.ExpArray(ln, array, frontend.ExpVar(ln, '$idx'))),
+                stmt,
+                increment(ln, '$idx', '+'),
             ])
         )
     ])
 
-def p_stmt_exp(p):
-    """stmt : exp semi"""
-    p[0] = frontend.StmtExp(p.lexer.lineno, p[1])
-
-
-def p_simple_type(p):
-    """simple_type : id"""
-    try:
-        p[0] = frontend.Type.get_by_name(p[1])
-    except errors.InvalidTypeError as ex:
-        ex.line = p.lexer.lineno
-        raise ex
-
-def p_type_array(p):
-    """type : id lbracket rbracket"""
-    try:
-        p[0] = frontend.Type.get_by_name(p[1]).array_type
-    except errors.InvalidTypeError as ex:
-        ex.line = p.lexer.lineno
-        raise ex
-
-def p_type(p):
-    """type : simple_type"""
-    p[0] = p[1]
-
-
-def p_exps(p):
-    """exps : exp comma exps """
-    p[0] = [p[1]] + p[3]
-
-def p_exps_one(p):
-    """exps : exp"""
-    p[0] = [p[1]]
-
-def p_exps_empty(p):
-    """exps : """
-    p[0] = []
-
-def p_exp_binop(p):
-    """exp : exp or exp
-           | exp and exp
-           | exp lt exp
-           | exp le exp
-           | exp gt exp
-           | exp ge exp
-           | exp eq exp
-           | exp ne exp
-           | exp plus exp
-           | exp minus exp
-           | exp times exp
-           | exp divide exp
-           | exp mod exp """
-    p[0] = frontend.ExpBinOp(p.lexer.lineno, p[2], p[1], p[3])
-
-def p_exp_unop(p):
-    """exp : minus exp %prec uminus
-           | not exp"""
-    p[0] = frontend.ExpUnOp(p.lexer.lineno, p[1], p[2])
-
-def p_exp_id(p):
-    """exp : id"""
-    p[0] = frontend.ExpVar(p.lexer.lineno, p[1])
-
-def p_exp_intconst(p):
-    """exp : intconst"""
-    p[0] = frontend.ExpIntConst(p.lexer.lineno, int(p[1]))
-
-def p_exp_stringconst(p):
-    """exp : stringconst"""
-    p[0] = frontend.ExpStringConst(p.lexer.lineno, p[1][1:-1])
-
-def p_exp_boolconst(p):
-    """exp : true
-           | false"""
-    p[0] = frontend.ExpBoolConst(p.lexer.lineno, p[1] == "true")
-
-def p_exp_fun(p):
-    """exp : id lparen exps rparen"""
-    p[0] = frontend.ExpFun(p.lexer.lineno, p[1], p[3])
-
-def p_exp_array(p):
-    """exp : id lbracket exp rbracket"""
-    p[0] = frontend.ExpArray(p.lexer.lineno, p[1], p[3])
-
-def p_exp_attr(p):
-    """exp : id dot id"""
-    p[0] = frontend.ExpAttr(p.lexer.lineno, p[1], p[3])
-
-def p_exp_new(p):
-    """exp : new simple_type lbracket exp rbracket"""
-    p[0] = frontend.ExpNewArray(p.lexer.lineno, p[2], p[4])
-
-def p_exp_paren(p):
-    """exp : lparen exp rparen"""
-    p[0] = p[2]
-
-
-def p_error(p):
-    raise errors.ParsingError(p and p.lexer.lineno or None)
-
-
-parser = yacc.yacc(debug=False)
+
+class Parser:
+    def __init__(self, tokens):
+        self.kinds, self.values, self.lines = tokens
+        self.pos = 0
+
+    def line(self):
+        """returns line number of the next token"""
+        if self.kinds[self.pos] == 'error':
+            raise self.values[self.pos]
+        return self.lines[self.pos]
+
+    def error(self):
+        """raises error of the unexpected next token"""
+        kind = self.kinds[self.pos]
+        if kind == 'error':
+            raise self.values[self.pos]
+        raise errors.ParsingError(None if kind == 'eof' else self.lines[self.pos])
+
+    def expect(self, kind):
+        """skips token of the kind and returns its value"""
+        if self.kinds[self.pos] != kind:
+            self.error()
+        self.pos += 1
+        return self.values[self.pos - 1]
+
+    def program(self):
+        topdefs = []
+        while self.kinds[self.pos] != 'eof':
+            topdefs.append(self.topdef())
+        return frontend.Program(self.line(), topdefs)
+
+    def topdef(self):
+        type = self.type()
+        name = self.expect('id')
+        self.expect('(')
+        args = []
+        while self.kinds[self.pos] != ')':  # a trailing comma is allowed
+            arg_type = self.type()
+            arg = self.expect('id')
+            args.append(frontend.FunArg(self.line(), arg_type, arg))
+            if self.kinds[self.pos] != ',':
+                break
+            self.pos += 1
+        self.expect(')')
+        block = self.block()
+        return frontend.TopDef(self.line(), type, name, args, block)
+
+    def type(self):
+        """returns type of a function or its argument"""
+        name = self.expect('id')
+        if self.kinds[self.pos] == '[':
+            self.pos += 1
+            self.expect(']')
+            return self.array_type(name)
+        if self.kinds[self.pos] != 'id':
+            self.error()
+        return self.simple_type(name)
+
+    def simple_type(self, name):
+        try:
+            return frontend.Type.get_by_name(name)
+        except errors.InvalidTypeError as ex:
+            ex.line = self.line()
+            raise ex
+
+    def element_type(self, name):
+        """returns type of elements of for and new, checked only if followed by an identifier or ["""
+        if self.kinds[self.pos] != 'id' and self.kinds[self.pos] != '[':
+            self.error()
+        return self.simple_type(name)
+
+    def array_type(self, name):
+        try:
+            return frontend.Type.get_by_name(name).array_type
+        except errors.InvalidTypeError as ex:
+            ex.line = self.lines[self.pos - 1]  # of the closing bracket
+            raise ex
+
+    def block(self):
+        self.expect('{')
+        stmts = []
+        while self.kinds[self.pos] != '}':
+            stmt = self.stmt()
+            if isinstance(stmt, list):
+                stmts.extend(stmt)
+            else:
+                stmts.append(stmt)
+        self.pos += 1
+        return frontend.StmtBlock(self.line(), stmts)
+
+    def stmt(self):
+        """returns a statement or a list of declarations"""
+        kind = self.kinds[self.pos]
+        if kind == 'id':
+            return self.id_stmt()
+        elif kind == ';':
+            self.pos += 1
+            return frontend.StmtSkip(self.line())
+        elif kind == '{':
+            return self.block()
+        elif kind == 'return':
+            self.pos += 1
+            if self.kinds[self.pos] == ';':
+                self.pos += 1
+                return frontend.StmtVoidReturn(self.line())
+            exp = self.exp()
+            self.expect(';')
+            return frontend.StmtReturn(self.line(), exp)
+        elif kind == 'if':
+            return self.if_stmt()
+        elif kind == 'while':
+            self.pos += 1
+            self.expect('(')
+            cond = self.exp()
+            self.expect(')')
+            stmt = self.stmt()
+            return frontend.StmtWhile(self.line(), cond, stmt)
+        elif kind == 'for':
+            self.pos += 1
+            self.expect('(')
+            type = self.element_type(self.expect('id'))
+            var = self.expect('id')
+            self.expect(':')
+            array = self.expect('id')
+            self.expect(')')
+            stmt = self.stmt()
+            return foreach(self.line(), type, var, array, stmt)
+        exp = self.exp()
+        self.expect(';')
+        return frontend.StmtExp(self.line(), exp)
+
+    def id_stmt(self):
+        """returns a statement starting with an identifier: declaration, assignment or expression"""
+        name = self.values[self.pos]
+        self.pos += 1
+        kind = self.kinds[self.pos]
+        if kind == 'id':
+            return self.decls(self.simple_type(name))
+        elif kind == '=':
+            self.pos += 1
+            exp = self.exp()
+            self.expect(';')
+            ln = self.line()
+            return frontend.StmtAssVar(ln, frontend.LhsVar(ln, name), exp)
+        elif kind == '++' or kind == '--':
+            self.pos += 1
+            self.expect(';')
+            return increment(self.line(), name, kind[0])
+        elif kind == '[':
+            self.pos += 1
+            if self.kinds[self.pos] == ']':
+                self.pos += 1
+                return self.decls(self.array_type(name))
+            idx = self.exp()
+            self.expect(']')
+            if self.kinds[self.pos] == '=':
+                self.pos += 1
+                exp = self.exp()
+                self.expect(';')
+                ln = self.line()
+                return frontend.StmtAssArray(ln, frontend.LhsArray(ln, name, idx), exp)
+            first = frontend.ExpArray(self.line(), name, idx)
+        else:
+            first = self.id_exp(name)
+        exp = self.exp(first)
+        self.expect(';')
+        return frontend.StmtExp(self.line(), exp)
+
+    def decls(self, type):
+        decls = []
+        while True:
+            name = self.expect('id')
+            if self.kinds[self.pos] == '=':
+                self.pos += 1
+                decls.append((name, self.exp()))
+            else:
+                decls.append((name,))
+            if self.kinds[self.pos] != ',':
+                break
+            self.pos += 1
+        self.expect(';')
+        ln = self.line()
+        return [frontend.StmtDeclInit(ln, type, decl[0], decl[1]) if len(decl) == 2 else frontend.StmtDecl(ln, type, decl[0])
+                for decl in decls]
+
+    def if_stmt(self):
+        """returns if statement, chains of else if are parsed in a loop"""
+        conds = []
+        stmts = []
+        other = None
+        while True:
+            self.pos += 1
+            self.expect('(')
+            conds.append(self.exp())
+            self.expect(')')
+            stmts.append(self.stmt())
+            if self.kinds[self.pos] != 'else':
+                break
+            self.pos += 1
+            if self.kinds[self.pos] != 'if':
+                other = self.stmt()
+                break
+        ln = self.line()
+        for cond, stmt in zip(reversed(conds), reversed(stmts)):
+            other = frontend.StmtIf(ln, cond, stmt) if other is None else frontend.StmtIfElse(ln, cond, stmt, other)
+        return other
+
+    def exp(self, first=None):
+        """returns expression (starting with the first operand if it is given)"""
+        exp = self.unary() if first is None else first
+        op = self.kinds[self.pos]
+        if op not in BINARY_OPS:
+            return exp
+        operands = [exp]
+        operators = []
+        while op in BINARY_OPS:
+            self.reduce(operands, operators, BINARY_OPS[op])
+            operators.append(op)
+            self.pos += 1
+            operands.append(self.unary())
+            op = self.kinds[self.pos]
+        self.reduce(operands, operators, 0)
+        return operands[0]
+
+    def reduce(self, operands, operators, prec):
+        """
+        replaces operators on top of the stack having higher precedence than prec (or equal for left associative ones)
+        and their operands with binary operations
+        """
+        ln = self.line()
+        while operators and (BINARY_OPS[operators[-1]] > prec or BINARY_OPS[operators[-1]] == prec > RIGHT_ASSOC):
+            exp2 = operands.pop()
+            operands[-1] = frontend.ExpBinOp(ln, operators.pop(), operands[-1], exp2)
+
+    def unary(self):
+        if self.kinds[self.pos] != '-' and self.kinds[self.pos] != '!':
+            return self.primary()
+        ops = []
+        while self.kinds[self.pos] == '-' or self.kinds[self.pos] == '!':
+            ops.append(self.kinds[self.pos])
+            self.pos += 1
+        exp = self.primary()
+        ln = self.line()
+        for op in reversed(ops):
+            exp = frontend.ExpUnOp(ln, op, exp)
+        return exp
+
+    def primary(self):
+        kind = self.kinds[self.pos]
+        value = self.values[self.pos]
+        self.pos += 1
+        if kind == 'id':
+            return self.id_exp(value)
+        elif kind == 'intconst':
+            return frontend.ExpIntConst(self.line(), int(value))
+        elif kind == 'stringconst':
+            return frontend.ExpStringConst(self.line(), value[1:-1])
+        elif kind == 'true' or kind == 'false':
+            return frontend.ExpBoolConst(self.line(), kind == 'true')
+        elif kind == 'new':
+            type = self.element_type(self.expect('id'))
+            self.expect('[')
+            exp = self.exp()
+            self.expect(']')
+            return frontend.ExpNewArray(self.line(), type, exp)
+        elif kind == '(':
+            exp = self.exp()
+            self.expect(')')
+            return exp
+        self.pos -= 1
+        self.error()
+
+    def id_exp(self, name):
+        """returns expression starting with identifier name"""
+        kind = self.kinds[self.pos]
+        if kind not in ID_EXP_SUFFIXES:
+            return frontend.ExpVar(self.line(), name)
+        elif kind == '(':
+            self.pos += 1
+            args = []
+            while self.kinds[self.pos] != ')':  # a trailing comma is allowed
+                args.append(self.exp())
+                if self.kinds[self.pos] != ',':
+                    break
+                self.pos += 1
+            self.expect(')')
+            return frontend.ExpFun(self.line(), name, args)
+        elif kind == '[':
+            self.pos += 1
+            idx = self.exp()
+            self.expect(']')
+            return frontend.ExpArray(self.line(), name, idx)
+        elif kind == '.':
+            self.pos += 1
+            attr = self.expect('id')
+            return frontend.ExpAttr(self.line(), name, attr)
+
 
 def parse(text):
-    return parser.parse(text, lexer=lexer)
+    """returns program parsed from the text (by the PLY parser if LATC_PARSER environment variable is ply)"""
+    if os.environ.get('LATC_PARSER') == 'ply':
+        import frontend.plyparser as plyparser  # generating the LALR parser takes time, it is loaded only if used
+        return plyparser.parse(text)
+    with stats.phase('lex'):
+        tokens = scanner.scan(text)
+    stats.count('tokens', len(tokens[0]) - 1)
+    with stats.phase('parse'):
+        return Parser(tokens).program()
@@ -27,64 +27,65 @@ for _k, _v in _lr_goto_items.items():
 del _lr_goto_items
 _lr_productions = [
   ("S' -> program","S'",1,None,None,None),
-  ('program -> topdefs','program',1,'p_program','parser.py',8),
-  ('topdefs -> topdef topdefs','topdefs',2,'p_topdefs','parser.py',12),
-  ('topdefs -> <empty>','topdefs',0,'p_topdefs_empty','parser.py',16),
-  ('topdef -> type id lparen args rparen block','topdef',6,'p_topdef','parser.py',20),
-  ('args -> arg comma args','args',3,'p_args','parser.py',24),
-  ('args -> arg','args',1,'p_args_one','parser.py',28),
-  ('args -> <empty>','args',0,'p_args_empty','parser.py',32),
-  ('arg -> type id','arg',2,'p_arg','parser.py',36),
-  ('stmts -> stmt stmts','stmts',2,'p_stmts','parser.py',41),
-  ('stmts -> <empty>','stmts',0,'p_stmts_empty','parser.py',48),
-  ('block -> lbrace stmts rbrace','block',3,'p_block','parser.py',52),
-  ('stmt -> semi','stmt',1,'p_stmt_empty','parser.py',56),
-  ('stmt -> block','stmt',1,'p_stmt_block','parser.py',60),
-  ('stmt -> type decls semi','stmt',3,'p_stmt_decl','parser.py',64),
-  ('decls -> decl comma decls','decls',3,'p_decls','parser.py',74),
-  ('decls -> decl','decls',1,'p_decls_one','parser.py',78),
-  ('decl -> id','decl',1,'p_decl','parser.py',82),
-  ('decl -> id equals exp','decl',3,'p_decl_init','parser.py',86),
-  ('stmt -> id equals exp semi','stmt',4,'p_stmt_ass','parser.py',90),
-  ('stmt -> id lbracket exp rbracket equals exp semi','stmt',7,'p_stmt_ass_array','parser.py',94),
-  ('stmt -> id plusplus semi','stmt',3,'p_stmt_inc','parser.py',98),
-  ('stmt -> id minusminus semi','stmt',3,'p_stmt_dec','parser.py',102),
-  ('stmt -> return exp semi','stmt',3,'p_stmt_return','parser.py',106),
-  ('stmt -> return semi','stmt',2,'p_stmt_void_return','parser.py',110),
-  ('stmt -> if lparen exp rparen stmt','stmt',5,'p_stmt_if','parser.py',114),
-  ('stmt -> if lparen exp rparen stmt else stmt','stmt',7,'p_stmt_if_else','parser.py',118),
-  ('stmt -> while lparen exp rparen stmt','stmt',5,'p_stmt_while','parser.py',122),
-  ('stmt -> for lparen simple_type id colon id rparen stmt','stmt',8,'p_stmt_foreach','parser.py',126),
-  ('stmt -> exp semi','stmt',2,'p_stmt_exp','parser.py',130),
-  ('simple_type -> id','simple_type',1,'p_simple_type','parser.py',135),
-  ('type -> id lbracket rbracket','type',3,'p_type_array','parser.py',143),
-  ('type -> simple_type','type',1,'p_type','parser.py',151),
-  ('exps -> exp comma exps','exps',3,'p_exps','parser.py',156),
-  ('exps -> exp','exps',1,'p_exps_one','parser.py',160),
-  ('exps -> <empty>','exps',0,'p_exps_empty','parser.py',164),
-  ('exp -> exp or exp','exp',3,'p_exp_binop','parser.py',168),
-  ('exp -> exp and exp','exp',3,'p_exp_binop','parser.py',169),
-  ('exp -> exp lt exp','exp',3,'p_exp_binop','parser.py',170),
-  ('exp -> exp le exp','exp',3,'p_exp_binop','parser.py',171),
-  ('exp -> exp gt exp','exp',3,'p_exp_binop','parser.py',172),
-  ('exp -> exp ge exp','exp',3,'p_exp_binop','parser.py',173),
-  ('exp -> exp eq exp','exp',3,'p_exp_binop','parser.py',174),
-  ('exp -> exp ne exp','exp',3,'p_exp_binop','parser.py',175),
-  ('exp -> exp plus exp','exp',3,'p_exp_binop','parser.py',176),
-  ('exp -> exp minus exp','exp',3,'p_exp_binop','parser.py',177),
-  ('exp -> exp times exp','exp',3,'p_exp_binop','parser.py',178),
-  ('exp -> exp divide exp','exp',3,'p_exp_binop','parser.py',179),
-  ('exp -> exp mod exp','exp',3,'p_exp_binop','parser.py',180),
-  ('exp -> minus exp','exp',2,'p_exp_unop','parser.py',184),
-  ('exp -> not exp','exp',2,'p_exp_unop','parser.py',185),
-  ('exp -> id','exp',1,'p_exp_id','parser.py',189),
-  ('exp -> intconst','exp',1,'p_exp_intconst','parser.py',193),
-  ('exp -> stringconst','exp',1,'p_exp_stringconst','parser.py',197),
-  ('exp -> true','exp',1,'p_exp_boolconst','parser.py',201),
-  ('exp -> false','exp',1,'p_exp_boolconst','parser.py',202),
-  ('exp -> id lparen exps rparen','exp',4,'p_exp_fun','parser.py',206),
-  ('exp -> id lbracket exp rbracket','exp',4,'p_exp_array','parser.py',210),
-  ('exp -> id dot id','exp',3,'p_exp_attr','parser.py',214),
-  ('exp -> new simple_type lbracket exp rbracket','exp',5,'p_exp_new','parser.py',218),
-  ('exp -> lparen exp rparen','exp',3,'p_exp_paren','parser.py',222),
+  ('program -> topdefs','program',1,'p_program','plyparser.py',27),
+  ('topdefs -> topdef topdefs','topdefs',2,'p_topdefs','plyparser.py',31),
+  ('topdefs -> <empty>','topdefs',0,'p_topdefs_empty','plyparser.py',35),
+  ('topdef -> type id lparen args rparen block','topdef',6,'p_topdef','plyparser.py',39),
+  ('args -> arg comma args','args',3,'p_args','plyparser.py',43),
+  ('args -> arg','args',1,'p_args_one','plyparser.py',47),
+  ('args -> <empty>','args',0,'p_args_empty','plyparser.py',51),
+  ('arg -> type id','arg',2,'p_arg','plyparser.py',55),
+  ('stmts -> stmt stmts','stmts',2,'p_stmts','plyparser.py',60),
+  ('stmts -> <empty>','stmts',0,'p_stmts_empty','plyparser.py',67),
+  ('block -> lbrace stmts rbrace','block',3,'p_block','plyparser.py',71),
+  ('stmt -> semi','stmt',1,'p_stmt_empty','plyparser.py',75),
+  ('stmt -> block','stmt',1,'p_stmt_block','plyparser.py',79),
+  ('stmt -> type decls semi','stmt',3,'p_stmt_decl','plyparser.py',83),
+  ('decls -> decl comma decls','decls',3,'p_decls','plyparser.py',93),
+  ('decls -> decl','decls',1,'p_decls_one','plyparser.py',97),
+  ('decl -> id','decl',1,'p_decl','plyparser.py',101),
+  ('decl -> id equals exp','decl',3,'p_decl_init','plyparser.py',105),
+  ('stmt -> id equals exp semi','stmt',4,'p_stmt_ass','plyparser.py',109),
+  ('stmt -> id lbracket exp rbracket equals exp semi','stmt',7,'p_stmt_ass_array','plyparser.py',113),
+  ('stmt -> id plusplus semi','stmt',3,'p_stmt_inc','plyparser.py',117),
+  ('stmt -> id minusminus semi','stmt',3,'p_stmt_dec','plyparser.py',121),
+  ('stmt -> return exp semi','stmt',3,'p_stmt_return','plyparser.py',125),
+  ('stmt -> return semi','stmt',2,'p_stmt_void_return','plyparser.py',129),
+  ('stmt -> if lparen exp rparen stmt','stmt',5,'p_stmt_if','plyparser.py',133),
+  ('stmt -> if lparen exp rparen stmt else stmt','stmt',7,'p_stmt_if_else','plyparser.py',137),
+  ('stmt -> while lparen exp rparen stmt','stmt',5,'p_stmt_while','plyparser.py',141),
+  ('stmt -> for lparen simple_type id colon id rparen stmt','stmt',8,'p_stmt_foreach','plyparser.py',145),
+  ('stmt -> exp semi','stmt',2,'p_stmt_exp','plyparser.py',149),
+  ('simple_type -> id','simple_type',1,'p_simple_type','plyparser.py',154),
+  ('type -> id lbracket rbracket','type',3,'p_type_array','plyparser.py',162),
+  ('type -> simple_type','type',1,'p_type','plyparser.py',170),
+  ('exps -> exp comma exps','exps',3,'p_exps','plyparser.py',175),
+  ('exps -> exp','exps',1,'p_exps_one','plyparser.py',179),
+  ('exps -> <empty>','exps',0,'p_exps_empty','plyparser.py',183),
+  ('exp -> exp or exp','exp',3,'p_exp_binop','plyparser.py',187),
+  ('exp -> exp and exp','exp',3,'p_exp_binop','plyparser.py',188),
+  ('exp -> exp lt exp','exp',3,'p_exp_binop','plyparser.py',189),
+  ('exp -> exp le exp','exp',3,'p_exp_binop','plyparser.py',190),
+  ('exp -> exp gt exp','exp',3,'p_exp_binop','plyparser.py',191),
+  ('exp -> exp ge exp','exp',3,'p_exp_binop','plyparser.py',192),
+  ('exp -> exp eq exp','exp',3,'p_exp_binop','plyparser.py',193),
+  ('exp -> exp ne exp','exp',3,'p_exp_binop','plyparser.py',194),
+  ('exp -> exp plus exp','exp',3,'p_exp_binop','plyparser.py',195),
+  ('exp -> exp minus exp','exp',3,'p_exp_binop','plyparser.py',196),
+  ('exp -> exp times exp','exp',3,'p_exp_binop','plyparser.py',197),
+  ('exp -> exp divide exp','exp',3,'p_exp_binop','plyparser.py',198),
+  ('exp -> exp mod exp','exp',3,'p_exp_binop','plyparser.py',199),
+  ('exp -> minus exp','exp',2,'p_exp_unop','plyparser.py',203),
+  ('exp -> not exp','exp',2,'p_exp_unop','plyparser.py',204),
+  ('exp -> id','exp',1,'p_exp_id','plyparser.py',208),
+  ('exp -> intconst','exp',1,'p_exp_intconst','plyparser.py',212),
+  ('exp -> stringconst','exp',1,'p_exp_stringconst','plyparser.py',216),
+  ('exp -> true','exp',1,'p_exp_boolconst','plyparser.py',220),
+  ('exp -> false','exp',1,'p_exp_boolconst','plyparser.py',221),
+  ('exp -> id lparen exps rparen','exp',4,'p_exp_fun','plyparser.py',225),
+  ('exp -> id lbracket exp rbracket','exp',4,'p_exp_array','plyparser.py',229),
+  ('exp -> id dot id','exp',3,'p_exp_attr','plyparser.py',233),
+  ('exp -> new simple_type lbracket exp rbracket','exp',5,'p_exp_new','plyparser.py',237),
+  ('exp -> lparen exp rparen','exp',3,'p_exp_paren','plyparser.py',241),
 ]
+stamp = '4310973c84249fbe010fffda839b9a4afd08b3bdd81f364c0cad6c3f3237f799'
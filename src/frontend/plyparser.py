@@ -0,0 +1,345 @@
+"""
+LALR parser generated by PLY (used with LATC_PARSER=ply, for comparison with the hand-written parser)
+
+tables of the lexer and the parser are generated into lextab.py and parsetab.py by python -m frontend.plyparser
+(make tables) and stamped with the version of PLY and a hash of the grammar; they are loaded without inspecting
+the grammar if the stamps are current, otherwise the tables are generated in memory (they are never written
+while compiling)
+"""
+import hashlib
+import os
+import sys
+import ply
+import ply.lex
+import ply.yacc as yacc
+import frontend
+import frontend.lexer
+import errors
+import stats
+from frontend.lexer import tokens, precedence
+from frontend.parser import increment, foreach
+
+GRAMMAR = [frontend.lexer.__file__, __file__]  # sources of the tables
+TABLES = ['lextab', 'parsetab']
+
+
+def p_program(p):
+    """program : topdefs"""
+    p[0] = frontend.Program(p.lexer.lineno, p[1])
+
+def p_topdefs(p):
+    """topdefs : topdef topdefs"""
+    p[0] = [p[1]] + p[2]
+
+def p_topdefs_empty(p):
+    """topdefs : """
+    p[0] = []
+
+def p_topdef(p):
+    """topdef : type id lparen args rparen block"""
+    p[0] = frontend.TopDef(p.lexer.lineno, p[1], p[2], p[4], p[6])
+
+def p_args(p):
+    """args : arg comma args"""
+    p[0] = [p[1]] + p[3]
+
+def p_args_one(p):
+    """args : arg"""
+    p[0] = [p[1]]
+
+def p_args_empty(p):
+    """args : """
+    p[0] = []
+
+def p_arg(p):
+    """arg : type id"""
+    p[0] = frontend.FunArg(p.lexer.lineno, p[1], p[2])
+
+
+def p_stmts(p):
+    """stmts : stmt stmts"""
+    if isinstance(p[1], list):
+        p[0] = p[1] + p[2]
+    else:
+        p[0] = [p[1]] + p[2]
+
+def p_stmts_empty(p):
+    """stmts : """
+    p[0] = []
+
+def p_block(p):
+    """block : lbrace stmts rbrace"""
+    p[0] = frontend.StmtBlock(p.lexer.lineno, p[2])
+
+def p_stmt_empty(p):
+    """stmt : semi"""
+    p[0] = frontend.StmtSkip(p.lexer.lineno)
+
+def p_stmt_block(p):
+    """stmt : block"""
+    p[0] = p[1]
+
+def p_stmt_decl(p):
+    """stmt : type decls semi"""
+    stmts = []
+    for decl in p[2]:
+        if len(decl) == 2:
+            stmts.append(frontend.StmtDeclInit(p.lexer.lineno, p[1], decl[0], decl[1]))
+        else:
+            stmts.append(frontend.StmtDecl(p.lexer.lineno, p[1], decl[0]))
+    p[0] = stmts
+
+def p_decls(p):
+    """decls : decl comma decls """
+    p[0] = [p[1]] + p[3]
+
+def p_decls_one(p):
+    """decls : decl"""
+    p[0] = [p[1]]
+
+def p_decl(p):
+    """decl : id"""
+    p[0] = (p[1],)
+
+def p_decl_init(p):
+    """decl : id equals exp"""
+    p[0] = (p[1], p[3])
+
+def p_stmt_ass(p):
+    """stmt : id equals exp semi"""
+    p[0] = frontend.StmtAssVar(p.lexer.lineno, frontend.LhsVar(p.lexer.lineno, p[1]), p[3])
+
+def p_stmt_ass_array(p):
+    """stmt : id lbracket exp rbracket equals exp semi"""
+    p[0] = frontend.StmtAssArray(p.lexer.lineno, frontend.LhsArray(p.lexer.lineno, p[1], p[3]), p[6])
+
+def p_stmt_inc(p):
+    """stmt : id plusplus semi"""
+    p[0] = increment(p.lexer.lineno, p[1], '+')
+
+def p_stmt_dec(p):
+    """stmt : id minusminus semi"""
+    p[0] = increment(p.lexer.lineno, p[1], '-')
+
+def p_stmt_return(p):
+    """stmt : return exp semi"""
+    p[0] = frontend.StmtReturn(p.lexer.lineno, p[2])
+
+def p_stmt_void_return(p):
+    """stmt : return semi"""
+    p[0] = frontend.StmtVoidReturn(p.lexer.lineno)
+
+def p_stmt_if(p):
+    """stmt : if lparen exp rparen stmt"""
+    p[0] = frontend.StmtIf(p.lexer.lineno, p[3], p[5])
+
+def p_stmt_if_else(p):
+    """stmt : if lparen exp rparen stmt else stmt"""
+    p[0] = frontend.StmtIfElse(p.lexer.lineno, p[3], p[5], p[7])
+
+def p_stmt_while(p):
+    """stmt : while lparen exp rparen stmt"""
+    p[0] = frontend.StmtWhile(p.lexer.lineno, p[3], p[5])
+
+def p_stmt_foreach(p):
+    """stmt : for lparen simple_type id colon id rparen stmt"""
+    p[0] = foreach(p.lexer.lineno, p[3], p[4], p[6], p[8])
+
+def p_stmt_exp(p):
+    """stmt : exp semi"""
+    p[0] = frontend.StmtExp(p.lexer.lineno, p[1])
+
+
+def p_simple_type(p):
+    """simple_type : id"""
+    try:
+        p[0] = frontend.Type.get_by_name(p[1])
+    except errors.InvalidTypeError as ex:
+        ex.line = p.lexer.lineno
+        raise ex
+
+def p_type_array(p):
+    """type : id lbracket rbracket"""
+    try:
+        p[0] = frontend.Type.get_by_name(p[1]).array_type
+    except errors.InvalidTypeError as ex:
+        ex.line = p.lexer.lineno
+        raise ex
+
+def p_type(p):
+    """type : simple_type"""
+    p[0] = p[1]
+
+
+def p_exps(p):
+    """exps : exp comma exps """
+    p[0] = [p[1]] + p[3]
+
+def p_exps_one(p):
+    """exps : exp"""
+    p[0] = [p[1]]
+
+def p_exps_empty(p):
+    """exps : """
+    p[0] = []
+
+def p_exp_binop(p):
+    """exp : exp or exp
+           | exp and exp
+           | exp lt exp
+           | exp le exp
+           | exp gt exp
+           | exp ge exp
+           | exp eq exp
+           | exp ne exp
+           | exp plus exp
+           | exp minus exp
+           | exp times exp
+           | exp divide exp
+           | exp mod exp """
+    p[0] = frontend.ExpBinOp(p.lexer.lineno, sys.intern(p[2]), p[1], p[3])
+
+def p_exp_unop(p):
+    """exp : minus exp %prec uminus
+           | not exp"""
+    p[0] = frontend.ExpUnOp(p.lexer.lineno, p[1], p[2])
+
+def p_exp_id(p):
+    """exp : id"""
+    p[0] = frontend.ExpVar(p.lexer.lineno, p[1])
+
+def p_exp_intconst(p):
+    """exp : intconst"""
+    p[0] = frontend.ExpIntConst(p.lexer.lineno, int(p[1]))
+
+def p_exp_stringconst(p):
+    """exp : stringconst"""
+    p[0] = frontend.ExpStringConst(p.lexer.lineno, p[1][1:-1])
+
+def p_exp_boolconst(p):
+    """exp : true
+           | false"""
+    p[0] = frontend.ExpBoolConst(p.lexer.lineno, p[1] == "true")
+
+def p_exp_fun(p):
+    """exp : id lparen exps rparen"""
+    p[0] = frontend.ExpFun(p.lexer.lineno, p[1], p[3])
+
+def p_exp_array(p):
+    """exp : id lbracket exp rbracket"""
+    p[0] = frontend.ExpArray(p.lexer.lineno, p[1], p[3])
+
+def p_exp_attr(p):
+    """exp : id dot id"""
+    p[0] = frontend.ExpAttr(p.lexer.lineno, p[1], p[3])
+
+def p_exp_new(p):
+    """exp : new simple_type lbracket exp rbracket"""
+    p[0] = frontend.ExpNewArray(p.lexer.lineno, p[2], p[4])
+
+def p_exp_paren(p):
+    """exp : lparen exp rparen"""
+    p[0] = p[2]
+
+
+def p_error(p):
+    raise errors.ParsingError(p and p.lexer.lineno or None)
+
+
+def stamp():
+    """returns stamp of tables generated from the current grammar by the installed version of PLY"""
+    h = hashlib.sha256(ply.__version__.encode())
+    for path in GRAMMAR:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def load():
+    """returns lexer and parser built from the prebuilt tables if they are current, otherwise from the grammar"""
+    try:
+        from frontend import lextab, parsetab
+        current = lextab.stamp == parsetab.stamp == stamp()
+    except (ImportError, AttributeError):
+        current = False
+    if not current:
+        return ply.lex.lex(module=frontend.lexer, debug=False), yacc.yacc(debug=False, write_tables=False)
+    plexer = ply.lex.Lexer()
+    plexer.readtab(lextab, vars(frontend.lexer))
+    table = yacc.LRTable()
+    table.read_table(parsetab)
+    table.bind_callables(globals())
+    return plexer, yacc.LRParser(table, p_error)
+
+
+def write_tables():
+    """generates stamped lextab.py and parsetab.py"""
+    outputdir = os.path.dirname(os.path.abspath(__file__))
+    for name in TABLES:  # otherwise PLY reads them instead of generating new ones
+        sys.modules.pop(f'frontend.{name}', None)
+        if os.path.exists(os.path.join(outputdir, f'{name}.py')):
+            os.remove(os.path.join(outputdir, f'{name}.py'))
+    ply.lex.lex(module=frontend.lexer, debug=False).writetab('lextab', outputdir)
+    yacc.yacc(debug=False, tabmodule='parsetab', outputdir=outputdir)
+    for name in TABLES:
+        with open(os.path.join(outputdir, f'{name}.py'), 'a') as f:
+            f.write(f'stamp = {stamp()!r}\n')
+
+
+lexer, parser = load()
+
+
+class TokenStream:
+    """lexer returning tokens lexed in advance, with line numbers the lexer had after returning them"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.lineno = 1
+
+    def token(self):
+        if self.pos == len(self.tokens):
+            return None
+        tok, self.lineno, err = self.tokens[self.pos]
+        self.pos += 1
+        if err is not None:
+            raise err
+        if tok is not None:
+            tok.lexer = self
+        return tok
+
+
+def lex(text):
+    """
+    returns list of (token, line number after it, error) for the whole text ending with None token or an error,
+    which is raised only when the parser gets to it (as it would be when lexing on demand)
+    """
+    plexer = lexer.clone()
+    plexer.lineno = 1
+    plexer.input(text)
+    tokens = []
+    while True:
+        try:
+            tok = plexer.token()
+        except errors.CompilerError as err:
+            tokens.append((None, plexer.lineno, err))
+            return tokens
+        tokens.append((tok, plexer.lineno, None))
+        if tok is None:
+            return tokens
+
+
+def parse(text):
+    if stats.enabled():  # lexing is timed separately
+        with stats.phase('lex'):
+            tokens = lex(text)
+        stats.count('tokens', len(tokens) - 1)
+        with stats.phase('parse'):
+            return parser.parse(lexer=TokenStream(tokens))
+    plexer = lexer.clone()  # every parse gets its own lexer state (line numbers)
+    plexer.lineno = 1
+    return parser.parse(text, lexer=plexer)
+
+
+if __name__ == '__main__':
+    write_tables()
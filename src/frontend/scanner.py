@@ -0,0 +1,69 @@
+"""
+hand-written scanner
+
+the text is split into tokens by one regular expression (in a single pass done by re.findall) and tokens
+are classified by their first characters; they are the same as those of the PLY lexer in frontend/lexer.py:
+longer alternatives are tried before their prefixes (as PLY does) and the same characters are ignored,
+so texts are split and rejected identically
+"""
+import re
+import sys
+import errors
+
+RESERVED = ("true", "false", "return", "if", "else", "while", "for", "new")
+OPERATORS = ("||", "&&", "<=", ">=", "==", "!=", "++", "--",
+             "+", "-", "*", "/", "%", "!", "<", ">", "=", "(", ")", "{", "}", "[", "]", ";", ",", ".", ":")
+KINDS = dict((t, t) for t in RESERVED + OPERATORS)  # kinds of these tokens are the tokens themselves
+ID_START = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+
+TOKEN_RE = re.compile(r'[ \t]*(' + '|'.join([
+    r'[a-zA-Z_]\w*',  # identifiers and reserved words
+    r'\n[\n \t]*',  # newlines (with indentation of the next line)
+    r'\|\||&&|<=|>=|==|!=|\+\+|--',
+    r'\d+',
+    r'/\*(?:.|\n)*?\*/|(?:\#|//).*',  # comments
+    r'"(?:[^\\\n]|(?:\\.))*?"',  # strings
+    r'[^ \t]',  # other operators and delimiters or an illegal character
+]) + ')')
+
+
+def scan(text):
+    """
+    returns lists of kinds, values and line numbers of tokens of the text ending with an 'eof' token
+    or an 'error' token (with IllegalCharacterError as its value) at the first illegal character;
+    kinds of operators, delimiters and reserved words are the tokens themselves, other kinds are
+    'id', 'intconst' and 'stringconst'
+    """
+    kinds = []
+    values = []
+    lines = []
+    line = 1
+    for value in TOKEN_RE.findall(text):
+        kind = KINDS.get(value)
+        if kind is None:
+            c = value[0]
+            if c in ID_START:
+                kind = 'id'
+                value = sys.intern(value)  # shared by all nodes using the identifier
+            elif c == '\n':
+                line += value.count('\n')
+                continue
+            elif c.isdecimal():
+                kind = 'intconst'
+            elif c == '"' and len(value) > 1:
+                kind = 'stringconst'
+            elif c == '#' or len(value) > 1:  # comments
+                line += value.count('\n')
+                continue
+            else:
+                kinds.append('error')
+                values.append(errors.IllegalCharacterError(line, value))
+                lines.append(line)
+                return kinds, values, lines
+        kinds.append(kind)
+        values.append(value)
+        lines.append(line)
+    kinds.append('eof')
+    values.append(None)
+    lines.append(line)
+    return kinds, values, lines
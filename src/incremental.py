@@ -0,0 +1,183 @@
+"""
+incremental compilation
+
+optimized code of every function is cached under a fingerprint of its AST (without line numbers)
+and signatures of functions it calls, so after a change only modified functions and functions
+depending on changed signatures are checked, translated and optimized again; with optimizations
+the fingerprint also covers ASTs of all functions it calls (directly or not), as they can be inlined;
+code of functions is kept pickled until it is written, so the whole program is never held in memory
+"""
+import pickle
+from dataclasses import fields
+import frontend
+from backend.llvm.translator import TranslationContext
+from backend.llvm.optimizer import optimize_functions, optimize_calls
+from backend.llvm.inliner import INLINE_BUDGET, strongly_connected_components
+import backend.llvm as llvm
+
+
+_fields = {}  # class of AST nodes -> names of its fields other than the line number
+
+
+def normalized(node, fids):
+    """returns AST as nested tuples without line numbers, adds ids of called functions to fids"""
+    if isinstance(node, frontend.Node):
+        if isinstance(node, frontend.ExpFun):
+            fids.add(node.fid)
+        cls = type(node)
+        if cls not in _fields:
+            _fields[cls] = [f.name for f in fields(cls) if f.name != 'lineno']
+        return (cls.__name__,) + tuple(normalized(getattr(node, name), fids) for name in _fields[cls])
+    elif isinstance(node, list):
+        return tuple(normalized(n, fids) for n in node)
+    elif isinstance(node, frontend.Type):
+        return str(node)
+    else:
+        return node
+
+
+def signature(fenv, fid):
+    try:
+        f = fenv[fid]
+    except KeyError:
+        return f'undefined {fid}'
+    return f'{f.type} {fid}(' + ', '.join(str(a.type) for a in f.args) + ')'
+
+
+def rename_globals(f: llvm.TopDef, addrs):
+    """replaces addresses of string literals used in function using given map"""
+    for b in f.blocks:
+        for s in b.stmts:
+            if isinstance(s, llvm.StmtGetElementPtr) and s.addr in addrs:
+                s.addr = addrs[s.addr]
+
+
+def used_globals(f: llvm.TopDef):
+    """returns addresses of string literals used in function in order of first use"""
+    addrs = {}
+    for b in f.blocks:
+        for s in b.stmts:
+            if isinstance(s, llvm.StmtGetElementPtr) and isinstance(s.addr, str):
+                addrs.setdefault(s.addr)
+    return list(addrs)
+
+
+def reachable_functions(fids, calls):
+    """returns ids of functions (from calls map) called from given functions directly or not, including them"""
+    reachable = set(fids)
+    work = list(fids)
+    while work:
+        for callee in calls[work.pop()]:
+            if callee in calls and callee not in reachable:
+                reachable.add(callee)
+                work.append(callee)
+    return reachable
+
+
+def deep_fingerprints(fingerprints, calls, cache):
+    """
+    returns map function id -> key of fingerprints of all functions (from calls map) it calls directly or not,
+    computed once for every strongly connected component of the call graph from keys of components it calls
+    """
+    graph = dict((fid, [callee for callee in callees if callee in calls]) for fid, callees in calls.items())
+    deep = {}
+    for component in strongly_connected_components(graph):
+        callees = set(callee for fid in component for callee in graph[fid] if callee not in component)
+        key = cache.key(sorted(fingerprints[fid] for fid in component), sorted(deep[fid] for fid in callees))
+        for fid in component:
+            deep[fid] = key
+    return deep
+
+
+def compile_program(program: frontend.Program, noopts, cache, jobs=1, inline_budget=INLINE_BUDGET):
+    """
+    does the same as Program.check(), translate_program and optimize_program (unless noopts is set),
+    but reuses cached code of unchanged functions, returns llvm.Program with a generator of functions
+    (each one is unpickled when it is written)
+    """
+    fenv = program.function_env()
+    asts = {}
+    calls = {}  # function id -> ids of all functions it calls
+    for topdef in program.topdefs:
+        if not isinstance(topdef, frontend.BuiltinFunDecl):
+            calls[topdef.id] = set()
+            asts[topdef.id] = normalized(topdef, calls[topdef.id])
+    inlining = not noopts and inline_budget > 0
+    if inlining:
+        deep = deep_fingerprints(dict((fid, cache.key('ast', ast)) for fid, ast in asts.items()), calls, cache)
+
+    keys = {}
+    entries = {}  # function id -> (called functions, pickled code, string literals, number of its own string literals)
+    checked = set()
+    for topdef in program.topdefs:
+        if isinstance(topdef, frontend.BuiltinFunDecl):
+            continue
+        inlined = deep[topdef.id] if inlining else None
+        keys[topdef.id] = cache.key('function', asts[topdef.id], sorted(signature(fenv, fid) for fid in calls[topdef.id]),
+                                    noopts, inline_budget if inlining else 0, inlined)
+        data = cache.get(keys[topdef.id])
+        if data is not None:
+            entries[topdef.id] = pickle.loads(data)
+        else:
+            topdef.check(fenv)
+            checked.add(topdef.id)
+
+    def called_functions(fid):
+        return entries[fid][0] if fid in entries else fenv[fid].called_functions
+    program.remove_unused_functions(called_functions)
+
+    # functions missing in the cache (and functions they can inline) are translated together,
+    # then their code is optimized together (possibly in parallel)
+    missing = [topdef.id for topdef in program.topdefs if topdef.id in checked]
+    needed = reachable_functions(missing, calls) if inlining else set(missing)
+    ctx = TranslationContext()
+    translated = []
+    own_globals = {}
+    for topdef in program.topdefs:
+        if topdef.id in needed:
+            if topdef.id not in checked:
+                topdef.check(fenv)
+            code = topdef.translate(ctx)
+            own_globals[topdef.id] = used_globals(code)
+            translated.append(code)
+    if not noopts:
+        optimize_calls(translated, inline_budget)
+    codes = [code for code in translated if code.id in checked]
+    if not noopts:
+        codes = optimize_functions(codes, jobs)
+
+    # cached code uses addresses of string literals numbered in order of their first use in the function
+    # (literals of the function itself first), so it doesn't depend on other functions
+    strings = dict((g.addr, s) for s, g in ctx.strlits.items())
+    for code in codes:
+        addrs = dict.fromkeys(own_globals[code.id])
+        for addr in used_globals(code):
+            addrs.setdefault(addr)
+        local = TranslationContext()
+        rename_globals(code, dict((addr, local.string_literal(strings[addr]).addr) for addr in addrs))
+        entries[code.id] = fenv[code.id].called_functions, pickle.dumps(code), [strings[addr] for addr in addrs], len(own_globals[code.id])
+        cache.put(keys[code.id], pickle.dumps(entries[code.id]))
+
+    # string literals are numbered as if the whole program was translated at once: in order of first use
+    # in translated functions (literals of inlined functions are numbered in the functions they come from)
+    gctx = TranslationContext()
+    for topdef in program.topdefs:
+        if not isinstance(topdef, frontend.BuiltinFunDecl):
+            _, _, strlits, own = entries[topdef.id]
+            for s in strlits[:own]:
+                gctx.string_literal(s)
+    # globals are a view of literals, as the functions can add literals of inlined functions removed as unused
+    return llvm.Program(written_functions(program, entries, gctx), gctx.strlits.values())
+
+
+def written_functions(program: frontend.Program, entries, gctx):
+    """yields code of functions of the program using addresses of string literals from gctx"""
+    for topdef in program.topdefs:
+        if isinstance(topdef, frontend.BuiltinFunDecl):
+            yield topdef.translate(gctx)
+            continue
+        _, data, strlits, _ = entries.pop(topdef.id)
+        code = pickle.loads(data)
+        local = TranslationContext()
+        rename_globals(code, dict((local.string_literal(s).addr, gctx.string_literal(s).addr) for s in strlits))
+        yield code
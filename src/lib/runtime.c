@@ -1,14 +1,30 @@
 #include <stdlib.h>
 #include <stdio.h>
 #include <string.h>
+#include <limits.h>
 
 void error() {
     printf("runtime error\n");
     exit(1);
 }
 
+/* strings are pointers to null-terminated characters (so they can be passed to C functions) preceded by
+   their length, string literals are laid out the same way by the compiler: {i64 length, [n x i8] chars};
+   elements of new string arrays are null pointers (zeroed memory), they are treated as empty strings */
+
+#define LENGTH(s) ((s) ? ((long*) (s))[-1] : 0)
+#define CHARS(s) ((s) ? (s) : "")
+
+static char* newString(long len) {
+    long* mem = malloc(sizeof(long) + len + 1);
+    if (!mem)
+        error();
+    mem[0] = len;
+    return (char*) (mem + 1);
+}
+
 void printString(char* s) {
-    printf("%s\n", s);
+    printf("%s\n", CHARS(s));
 }
 
 void printInt(long i) {
@@ -16,12 +32,15 @@ void printInt(long i) {
 }
 
 char* readString() {
-    char* str = 0;
-    size_t len;
-    getline(&str, &len, stdin);
-    size_t end = strlen(str) - 1;
-    if (str[end] == '\n')
-        str[end] = '\0';
+    char* line = 0;
+    size_t size;
+    long len = getline(&line, &size, stdin) > 0 ? strlen(line) : 0;  /* nothing is read at the end of input */
+    if (len > 0 && line[len - 1] == '\n')
+        len--;
+    char* str = newString(len);
+    memcpy(str, line, len);
+    str[len] = '\0';
+    free(line);
     return str;
 }
 
@@ -36,7 +55,16 @@ long readInt() {
 /* internal functions: */
 
 int _compareStrings(int op, char* str1, char* str2) {
-    int c = strcmp(str1, str2);
+    long len1 = LENGTH(str1), len2 = LENGTH(str2);
+    str1 = CHARS(str1);
+    str2 = CHARS(str2);
+    if (op <= 1) {  /* equality: the same string or different lengths are decided without comparing characters */
+        int equal = str1 == str2 || (len1 == len2 && memcmp(str1, str2, len1) == 0);
+        return op == 0 ? equal : !equal;
+    }
+    int c = memcmp(str1, str2, len1 < len2 ? len1 : len2);
+    if (c == 0)
+        c = (len1 > len2) - (len1 < len2);
     switch(op) {
         case 0:
             return c == 0;
@@ -56,8 +84,42 @@ int _compareStrings(int op, char* str1, char* str2) {
 }
 
 char* _addStrings(char* str1, char* str2) {
-    char* str = malloc((strlen(str1) + strlen(str2) + 1) * sizeof(char));
-    strcpy(str, str1);
-    strcat(str, str2);
+    long len1 = LENGTH(str1), len2 = LENGTH(str2);
+    char* str = newString(len1 + len2);
+    str1 = CHARS(str1);
+    str2 = CHARS(str2);
+    memcpy(str, str1, len1);
+    memcpy(str + len1, str2, len2 + 1);
     return str;
 }
+
+/* arrays: zeroed memory for elements is allocated from big chunks (never freed),
+   arrays too big for a chunk get memory of their own */
+
+#define CHUNK_SIZE (1 << 20)
+
+static char* chunk = 0;
+static size_t chunk_left = 0;
+
+void* _newArray(long count, long size) {
+    if (count < 0 || count > LONG_MAX / size)
+        error();
+    size_t bytes = ((size_t) count * size + 7) & ~(size_t) 7;
+    void* mem;
+    if (bytes > CHUNK_SIZE / 4) {
+        mem = calloc(bytes, 1);
+        if (!mem)
+            error();
+        return mem;
+    }
+    if (bytes > chunk_left) {
+        chunk = calloc(CHUNK_SIZE, 1);
+        if (!chunk)
+            error();
+        chunk_left = CHUNK_SIZE;
+    }
+    mem = chunk;
+    chunk += bytes;
+    chunk_left -= bytes;
+    return mem;
+}
@@ -0,0 +1,53 @@
+"""
+native code generation in process (requires llvmlite)
+
+usage: compiler.py native [-O level] [--noopts] [--emit obj|bc] [-o output] [--runtime runtime.bc] [--run] (file.lat | file.ll)
+
+compiles the program (or reads LLVM code from a .ll file), links it with lib/runtime.bc, optimizes it with LLVM
+and writes an object file or bitcode (file.o or file.bc by default), with --run main is compiled by the JIT
+and executed instead (standard input and output are passed to the program, its result is the exit code);
+with --runtime '' nothing is linked (runtime functions have to be provided by a library loaded in the process)
+"""
+import argparse
+import os
+import sys
+import compiler
+import backend.llvm.native as native
+
+
+def main(args):
+    argparser = argparse.ArgumentParser(prog=f'{sys.argv[0]} native')
+    argparser.add_argument('-O', dest='level', type=int, choices=native.OPT_LEVELS, default=2)
+    argparser.add_argument('--noopts', action='store_true')
+    argparser.add_argument('--emit', choices=['obj', 'bc'], default='obj')
+    argparser.add_argument('-o', '--output')
+    argparser.add_argument('--runtime', default=native.RUNTIME)
+    argparser.add_argument('--run', action='store_true')
+    argparser.add_argument('source')
+    args = argparser.parse_args(args)
+
+    with open(args.source) as f:
+        text = f.read()
+    if args.source.endswith('.ll'):
+        ir = text
+    else:
+        code, ir, err = compiler.compile_args(['c', 'noopts' if args.noopts else ''], text)
+        if code != 0:
+            sys.stderr.write(err)
+            exit(code)
+
+    if args.runtime and not os.path.exists(args.runtime):
+        print(f'runtime library {args.runtime} not found (it is built by make runtime)', file=sys.stderr)
+        exit(1)
+    try:
+        machine = native.target_machine(args.level)
+    except ImportError as ex:
+        print(ex, file=sys.stderr)
+        exit(1)
+    module = native.build_module(ir, machine, args.runtime or None)
+    native.optimize(module, machine, args.level)
+    if args.run:
+        exit(native.run(module, machine) & 0xff)
+    output = args.output or args.source.rsplit('.', 1)[0] + '.' + ('o' if args.emit == 'obj' else 'bc')
+    with open(output, 'wb') as f:
+        f.write(native.emit(module, machine, args.emit))
@@ -0,0 +1,75 @@
+"""
+compile server listening on a unix socket
+
+usage: compiler.py serve socket
+
+the parser tables and compiler modules are loaded once, each job is handled
+in a forked child process, so it always starts from the same clean state;
+output is sent to the client while it is written
+"""
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import traceback
+import compiler
+from client import OutputWriter, read_message, write_message
+
+compiler.preload()  # otherwise the backend would be loaded by every job
+if os.environ.get('LATC_PARSER') == 'ply':
+    import frontend.plyparser
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            header, (source,) = read_message(self.rfile)
+        except (EOFError, ValueError):
+            return
+        out = OutputWriter(self.wfile)
+        try:
+            code, _, err = compiler.compile_args(header['args'], source.decode(), out, header.get('env', {}))
+        except Exception:  # report internal errors like an uncaught exception would
+            code, err = 1, traceback.format_exc()
+        out.flush()
+        write_message(self.wfile, {'code': code}, err.encode())
+
+
+def answers(path):
+    """returns whether something accepts connections on the unix socket"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+class Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+def main(args):
+    if len(args) != 1:
+        print(f'usage: {sys.argv[0]} serve (socket)', file=sys.stderr)
+        exit(1)
+    path = args[0]
+    if os.path.lexists(path):
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            print(f'{path} exists and is not a socket', file=sys.stderr)
+            exit(1)
+        if answers(path):
+            print(f'a server is already listening on {path}', file=sys.stderr)
+            exit(1)
+        os.unlink(path)  # left by a server which didn't exit cleanly
+
+    signal.signal(signal.SIGTERM, lambda *_: exit(0))
+    with Server(path, Handler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
@@ -0,0 +1,22 @@
+"""
+dataclasses with __slots__ instead of a __dict__ for objects created in large numbers (syntax tree nodes,
+LLVM statements and blocks); dataclass(slots=True) would need Python 3.10
+"""
+from dataclasses import dataclass, fields
+
+
+def slotted(cls, attrs=()):
+    """
+    returns dataclass made of cls with __slots__ holding its new fields, attributes listed in its __slots__
+    and given attributes (both set outside __init__), all its base classes have to be slotted too;
+    methods of cls must not use super() without arguments (it refers to the class replaced here)
+    """
+    cls = dataclass(cls)
+    inherited = set()
+    for base in cls.__mro__[1:]:
+        inherited.update(getattr(base, '__slots__', ()))
+    names = [f.name for f in fields(cls)] + list(cls.__dict__.get('__slots__', ())) + list(attrs)
+    slots = tuple(name for name in dict.fromkeys(names) if name not in inherited)
+    namespace = dict((k, v) for k, v in cls.__dict__.items() if k not in slots and k not in ('__dict__', '__weakref__'))
+    namespace['__slots__'] = slots
+    return type(cls.__name__, cls.__bases__, namespace)
@@ -0,0 +1,150 @@
+"""
+compiler statistics: wall time and peak memory (traced by tracemalloc) of compilation phases and counters
+
+collected only inside collect() (compiler.py --stats), otherwise all functions do nothing;
+phases can be nested, a nested phase is reported as 'outer/inner' and its time and memory
+are included in the outer one, phases entered many times (e.g. once per function) are summed up
+"""
+import time
+from contextlib import contextmanager
+from dataclasses import fields
+import frontend
+
+_current = None
+
+
+class Stats:
+    def __init__(self):
+        self.phases = {}  # name -> [calls, seconds, peak bytes]
+        self.counters = {}
+        self.stack = []  # [name, start time, memory at start, peak so far] of entered phases
+
+    def enter(self, name):
+        import tracemalloc  # imported only when statistics are collected
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            self.stack[-1][3] = max(self.stack[-1][3], peak)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        name = f'{self.stack[-1][0]}/{name}' if self.stack else name
+        self.phases.setdefault(name, [0, 0.0, 0])  # phases are reported in the order they are first entered
+        self.stack.append([name, time.perf_counter(), current, current])
+
+    def exit(self):
+        import tracemalloc
+        name, start, memory, peak = self.stack.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        if self.stack:
+            self.stack[-1][3] = max(self.stack[-1][3], peak)
+        phase = self.phases[name]
+        phase[0] += 1
+        phase[1] += time.perf_counter() - start
+        phase[2] = max(phase[2], peak - memory)
+
+    def report(self, fmt):
+        if fmt == 'json':
+            import json
+            phases = dict((name, {'calls': calls, 'seconds': seconds, 'peak_bytes': peak})
+                          for name, (calls, seconds, peak) in self.phases.items())
+            return json.dumps({'phases': phases, 'counters': self.counters}) + '\n'
+        lines = [f'{"phase":<32} {"calls":>7} {"time [ms]":>10} {"peak [kB]":>10}']
+        for name, (calls, seconds, peak) in self.phases.items():
+            label = '  ' * name.count('/') + name.rsplit('/', 1)[-1]
+            lines.append(f'{label:<32} {calls:>7} {seconds * 1000:>10.2f} {peak / 1024:>10.1f}')
+        lines.append('')
+        lines.extend(f'{name:<32} {value:>7}' for name, value in self.counters.items())
+        return '\n'.join(lines) + '\n'
+
+
+def parse_option(args):
+    """returns arguments without the --stats[=text|json] option and the requested format (None if not given)"""
+    fmt = None
+    rest = []
+    for arg in args:
+        if arg == '--stats' or arg.startswith('--stats='):
+            fmt = arg.partition('=')[2] or 'text'
+        else:
+            rest.append(arg)
+    return rest, fmt
+
+
+@contextmanager
+def collect():
+    """collects statistics of the code run inside, yields Stats"""
+    import tracemalloc
+    global _current
+    _current = Stats()
+    tracemalloc.start()
+    try:
+        with phase('total'):
+            yield _current
+    finally:
+        tracemalloc.stop()
+        _current = None
+
+
+def enabled():
+    return _current is not None
+
+
+@contextmanager
+def phase(name):
+    if _current is None:
+        yield
+        return
+    _current.enter(name)
+    try:
+        yield
+    finally:
+        _current.exit()
+
+
+def count(name, n=1):
+    if _current is not None:
+        _current.counters[name] = _current.counters.get(name, 0) + n
+
+
+def timed(name, iterable):
+    """yields items of iterable, time of producing them is counted as the phase"""
+    if _current is None:
+        return iterable
+    return _timed(name, iter(iterable))
+
+
+def _timed(name, it):
+    while True:
+        with phase(name):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+def counted(prefix, functions):
+    """yields given LLVM functions counting their blocks and instructions"""
+    if _current is None:
+        return functions
+    return _counted(prefix, functions)
+
+
+def _counted(prefix, functions):
+    for f in functions:
+        blocks = getattr(f, 'blocks', [])
+        count(f'{prefix} blocks', len(blocks))
+        count(f'{prefix} instructions', sum(len(b.stmts) for b in blocks))
+        yield f
+
+
+def ast_nodes(node):
+    """returns number of nodes of the abstract syntax tree"""
+    n = 0
+    work = [node]
+    while work:
+        node = work.pop()
+        if isinstance(node, list):
+            work.extend(node)
+        elif isinstance(node, frontend.Node):
+            n += 1
+            work.extend(getattr(node, f.name) for f in fields(node))
+    return n